@@ -27,11 +27,25 @@
 # value for a key is whatever was found in the ADIF, as a string.
 # Order of QSOs in the list is same as in ADIF file.
 
+import codecs
+import gzip
+import hashlib
 import math
+import mmap
+import os
+import pickle
 import re
-from collections.abc import MutableMapping
+import sys
+from array import array
+from collections.abc import Iterable, Mapping, MutableMapping
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Iterator, Optional
+from typing import Any, Iterator, Optional, TextIO, Union
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for time_on_array / time_off_array.
+    np = None
 
 PROGRAMM_VERSION = "0.6.0"
 
@@ -91,6 +105,31 @@ class QSO(_SaneStringMapping):
         return qso_to_adif(self)
 
 
+class LazyQSO(QSO):
+    """A QSO whose field values stay undecoded in the source buffer.
+
+    Values are decoded on first access and then kept.
+    Produced by `read_from_bytes` and `read_from_mmap`.
+    """
+
+    def __init__(self, buf: Any, offsets: dict[str, Any], encoding: str):
+        self._buf = buf
+        self._encoding = encoding
+        # Values are either decoded strings or (start, end) offsets into buf.
+        self._d = offsets
+
+    def __getitem__(self, key: str) -> str:
+        ku = key.upper()
+        value = self._d[ku]
+        if not isinstance(value, str):
+            value = str(self._buf[value[0] : value[1]], self._encoding)
+            self._d[ku] = value
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key.upper() in self._d
+
+
 # Some type definition; however, it may change.
 class Headers(_SaneStringMapping):
     def __str__(self) -> str:
@@ -113,21 +152,23 @@ def headers_from_dict(d: dict[str, str]) -> Headers:
     return Headers(d)
 
 
-def read_from_string(adif_string: str) -> tuple[list[QSO], Headers]:
-    """Read an ADIF string. Return QSO list and any headers found."""
-    # The ADIF file header keys and values, if any.
-    adif_headers: dict[str, str] = {}
+_HEADER_FIELD_RE = re.compile(r"<((eoh)|(\w+)\:(\d+)(\:[^>]+)?)>", re.IGNORECASE)
+_FIELD_RE = re.compile(r"<((eor)|(\w+)\:(\d+)(\:[^>]+)?)>", re.IGNORECASE)
 
-    header_field_re = re.compile(r"<((eoh)|(\w+)\:(\d+)(\:[^>]+)?)>", re.IGNORECASE)
-    field_re = re.compile(r"<((eor)|(\w+)\:(\d+)(\:[^>]+)?)>", re.IGNORECASE)
 
-    qsos: list[QSO] = []
+def _parse_header(adif_string: str) -> tuple[dict[str, str], int]:
+    """Parse the ADIF header, if any.
+
+    Return the header fields and the cursor position just after <EOH>
+    (0 if the input does not start with a header).
+    """
+    adif_headers: dict[str, str] = {}
     cursor = 0
-    if adif_string[0] != "<":
+    if adif_string and adif_string[0] != "<":
         # Input has ADIF header. Read all header fields.
         eoh_found = False
         while not eoh_found:
-            header_field_mo = header_field_re.search(adif_string, cursor)
+            header_field_mo = _HEADER_FIELD_RE.search(adif_string, cursor)
             if header_field_mo:
                 if header_field_mo.group(2):
                     eoh_found = True
@@ -147,20 +188,36 @@ def read_from_string(adif_string: str) -> tuple[list[QSO], Headers]:
                 raise AdifHeaderWithoutEOHError(
                     "<EOF> marker missing after ADIF header."
                 )
+    return adif_headers, cursor
+
 
+def _parse_records(adif_string: str, cursor: int) -> tuple[list[QSO], int]:
+    """Parse QSO records starting at `cursor`.
+
+    Parsing stops when no further field is found or when a field value
+    runs past the end of `adif_string`.
+    Return the QSOs found and the position just after the last <EOR>
+    consumed (`cursor` itself if no record was completed).
+    """
+    qsos: list[QSO] = []
+    done = cursor
     one_qso: dict[str, str] = {}
-    field_mo = field_re.search(adif_string, cursor)
+    end = len(adif_string)
+    field_mo = _FIELD_RE.search(adif_string, cursor)
     while field_mo:
         if field_mo.group(2):
             # <eor> found:
             qsos.append(qso_from_dict(one_qso))
             one_qso = {}
-            cursor = field_mo.end(0)
+            cursor = done = field_mo.end(0)
         else:
             # Field found:
             field = field_mo.group(3).upper()
             value_start = field_mo.end(0)
             value_end = value_start + int(field_mo.group(4))
+            if value_end > end:
+                # Value is cut off, we cannot know what follows.
+                break
             value = adif_string[value_start:value_end]
             if field in one_qso:
                 raise AdifDuplicateFieldError(
@@ -168,16 +225,917 @@ def read_from_string(adif_string: str) -> tuple[list[QSO], Headers]:
                 )
             one_qso[field] = value
             cursor = value_end
-        field_mo = field_re.search(adif_string, cursor)
+        field_mo = _FIELD_RE.search(adif_string, cursor)
+
+    return qsos, done
+
+
+_WORD_RE = re.compile(r"\w+")
+
 
+def _parse_tag(tag: str) -> Optional[tuple[str, int]]:
+    """Decode the text between "<" and ">" the way _FIELD_RE does.
+
+    Return ("", 0) for <eor>, (FIELD, length) for a field
+    and None if this is not an ADIF tag at all.
+    """
+    if tag.upper() == "EOR":
+        return ("", 0)
+    name, colon, rest = tag.partition(":")
+    length, colon, type_indicator = rest.partition(":")
+    if (
+        not _WORD_RE.fullmatch(name)
+        or not length.isdecimal()
+        or (colon and not type_indicator)
+    ):
+        return None
+    return (name.upper(), int(length))
+
+
+def _parse_records_fast(adif_string: str, cursor: int) -> tuple[list[QSO], int]:
+    """Same as `_parse_records`, but without the regex engine.
+
+    Tags are located with `str.find`; a log uses only a few distinct
+    tags, so each one is decoded once and then looked up in a dict.
+    """
+    qsos: list[QSO] = []
+    done = cursor
+    one_qso: dict[str, str] = {}
+    has_empty = False
+    end = len(adif_string)
+    find = adif_string.find
+    tags: dict[str, Optional[tuple[str, int]]] = {}
+    new_qso = QSO.__new__
+    while True:
+        lt = find("<", cursor)
+        if lt < 0:
+            break
+        gt = find(">", lt + 1)
+        if gt < 0:
+            break
+        tag = adif_string[lt + 1 : gt]
+        try:
+            parsed = tags[tag]
+        except KeyError:
+            parsed = tags[tag] = _parse_tag(tag)
+        if parsed is None:
+            # Not a tag, look for one in what follows the "<".
+            cursor = lt + 1
+            continue
+        field, length = parsed
+        if not field:
+            # <eor> found. Keys are upper case already,
+            # so the QSO can be built without going through qso_from_dict.
+            qso = new_qso(QSO)
+            qso._d = (
+                {k: v for k, v in one_qso.items() if v} if has_empty else one_qso
+            )
+            qsos.append(qso)
+            one_qso = {}
+            has_empty = False
+            cursor = done = gt + 1
+            continue
+        value_start = gt + 1
+        value_end = value_start + length
+        if value_end > end:
+            # Value is cut off, we cannot know what follows.
+            break
+        value = adif_string[value_start:value_end]
+        if field in one_qso:
+            raise AdifDuplicateFieldError(
+                f'Duplication in qso {one_qso}, {field} previously "{one_qso[field]}", now "{value}".'
+            )
+        if not length:
+            has_empty = True
+        one_qso[field] = value
+        cursor = value_end
+
+    return qsos, done
+
+
+# Record parsers selectable with the `parser` argument of the readers.
+_PARSERS = {
+    "regex": _parse_records,
+    "fast": _parse_records_fast,
+}
+
+
+def _record_parser(parser: str) -> Any:
+    try:
+        return _PARSERS[parser]
+    except KeyError:
+        raise ValueError(
+            f"Unknown ADIF parser {parser!r}, use one of {sorted(_PARSERS)}."
+        ) from None
+
+
+def read_from_string(
+    adif_string: str, parser: str = "regex"
+) -> tuple[list[QSO], Headers]:
+    """Read an ADIF string. Return QSO list and any headers found.
+
+    `parser` selects the record parser: "regex" (the default)
+    or "fast", a hand-written tokenizer giving the same results.
+    """
+    parse_records = _record_parser(parser)
+    adif_headers, cursor = _parse_header(adif_string)
+    qsos, _ = parse_records(adif_string, cursor)
     return (qsos, headers_from_dict(adif_headers))
 
 
-def read_from_file(filename: str, encoding: str = "UTF-8") -> tuple[list[QSO], Headers]:
-    """Read ADIF from a file."""
-    with open(filename, encoding=encoding) as adif_file:
+def read_from_file(
+    filename: str, encoding: str = "UTF-8", parser: str = "regex", workers: int = 1
+) -> tuple[list[QSO], Headers]:
+    """Read ADIF from a file.
+
+    With `workers` > 1, large files are split into chunks at <EOR>
+    markers and the chunks are parsed in that many processes.
+    Line ends are not translated: the field lengths count "\r\n"
+    in a value as two characters.
+    """
+    if workers > 1 and _parallel_ok(filename, encoding):
+        return _read_from_file_parallel(filename, encoding, parser, workers)
+    with open(filename, encoding=encoding, newline="") as adif_file:
         adif_string = adif_file.read()
-        return read_from_string(adif_string)
+        return read_from_string(adif_string, parser)
+
+
+# Files smaller than this are not worth starting a process pool for.
+_PARALLEL_MIN_SIZE = 4 << 20
+
+_EOR_RE_B = re.compile(rb"<eor>", re.IGNORECASE)
+
+
+def _parallel_ok(filename: str, encoding: str) -> bool:
+    # Chunks are cut at byte offsets of "<eor>", which is only safe
+    # if no multi-byte character can contain ASCII bytes.
+    name = codecs.lookup(encoding).name
+    if not (name in ("utf-8", "ascii") or name.startswith(("iso8859", "latin", "cp125"))):
+        return False
+    return os.path.getsize(filename) >= _PARALLEL_MIN_SIZE
+
+
+def _read_header_from_file(filename: str, encoding: str) -> tuple[dict[str, str], int]:
+    """Parse the header of an ADIF file.
+
+    Return the header fields and the byte offset where the records start.
+    """
+    # No newline translation: the offset must count "\r\n" as two bytes.
+    with open(filename, encoding=encoding, newline="") as adif_file:
+        adif_string = ""
+        while True:
+            chunk = adif_file.read(1 << 16)
+            adif_string += chunk
+            try:
+                adif_headers, cursor = _parse_header(adif_string)
+                break
+            except AdifHeaderWithoutEOHError:
+                if not chunk:
+                    raise
+    return adif_headers, len(adif_string[:cursor].encode(encoding))
+
+
+def _parse_file_chunk(
+    filename: str, encoding: str, parser: str, start: int, stop: int
+) -> tuple[list[dict[str, str]], bool]:
+    """Parse the records between two byte offsets of an ADIF file.
+
+    Runs in a worker process. Return the QSOs as plain dicts
+    (cheaper to send back) and whether the last record parsed ended
+    exactly at `stop`, i.e. whether `stop` is a real record boundary.
+    """
+    with open(filename, "rb") as adif_file:
+        adif_file.seek(start)
+        adif_string = adif_file.read(stop - start).decode(encoding)
+    qsos, done = _record_parser(parser)(adif_string, 0)
+    return [q._d for q in qsos], done == len(adif_string)
+
+
+def _read_from_file_parallel(
+    filename: str, encoding: str, parser: str, workers: int
+) -> tuple[list[QSO], Headers]:
+    adif_headers, start = _read_header_from_file(filename, encoding)
+    size = os.path.getsize(filename)
+
+    # Split at the first <eor> after each 1/workers of the file.
+    # Such an <eor> may be text inside a value (e.g. in NOTES),
+    # so each worker also reports whether its chunk really ended with
+    # a record; the first worker starts right after the header,
+    # so by induction all chunks start at record boundaries.
+    bounds = [start]
+    with open(filename, "rb") as adif_file:
+        with mmap.mmap(adif_file.fileno(), 0, access=mmap.ACCESS_READ) as adif_map:
+            for k in range(1, workers):
+                target = max(start + (size - start) * k // workers, bounds[-1])
+                eor_mo = _EOR_RE_B.search(adif_map, target)
+                if eor_mo is None:
+                    break
+                if eor_mo.end(0) > bounds[-1]:
+                    bounds.append(eor_mo.end(0))
+    bounds.append(size)
+
+    chunks = list(zip(bounds[:-1], bounds[1:]))
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        results = list(
+            pool.map(
+                _parse_file_chunk,
+                *zip(*((filename, encoding, parser, a, b) for a, b in chunks)),
+            )
+        )
+
+    if not all(complete for _, complete in results[:-1]):
+        # A split point was inside a value, parse the whole file instead.
+        return read_from_file(filename, encoding, parser)
+
+    qsos: list[QSO] = []
+    new_qso = QSO.__new__
+    for records, _ in results:
+        for d in records:
+            qso = new_qso(QSO)
+            qso._d = d
+            qsos.append(qso)
+    return (qsos, headers_from_dict(adif_headers))
+
+
+# Bump whenever the layout of the cache file changes.
+_CACHE_FORMAT = 1
+
+
+def _file_digest(filename: str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(filename, "rb") as adif_file:
+        for block in iter(lambda: adif_file.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _source_key(filename: str, encoding: str, verify_hash: bool) -> tuple[Any, ...]:
+    st = os.stat(filename)
+    digest = _file_digest(filename) if verify_hash else None
+    return (_CACHE_FORMAT, st.st_size, st.st_mtime_ns, encoding.lower(), digest)
+
+
+def _load_cache(cache_file: str, key: tuple[Any, ...]) -> Optional[tuple[list[QSO], Headers]]:
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+        if cached["key"] != key:
+            return None
+        layouts = cached["layouts"]
+        qsos: list[QSO] = []
+        new_qso = QSO.__new__
+        for layout, values in cached["records"]:
+            qso = new_qso(QSO)
+            qso._d = dict(zip(layouts[layout], values))
+            qsos.append(qso)
+        return (qsos, headers_from_dict(cached["headers"]))
+    except Exception:
+        # Missing, stale, truncated or from another version: just re-parse.
+        return None
+
+
+def _save_cache(
+    cache_file: str, key: tuple[Any, ...], qsos: list[QSO], headers: Headers
+) -> None:
+    # Most QSOs of a log share the same set of fields, so store each set
+    # of keys once and every QSO as (index of its key set, values).
+    layout_index: dict[tuple[str, ...], int] = {}
+    records = []
+    for qso in qsos:
+        keys = tuple(qso)
+        layout = layout_index.get(keys)
+        if layout is None:
+            layout = layout_index[keys] = len(layout_index)
+        records.append((layout, tuple(qso[k] for k in keys)))
+    cached = {
+        "key": key,
+        "headers": dict(headers),
+        "layouts": list(layout_index),
+        "records": records,
+    }
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # A cache we cannot write is no reason to fail reading the log.
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+
+def read_from_file_cached(
+    filename: str,
+    encoding: str = "UTF-8",
+    cache_file: Optional[str] = None,
+    verify_hash: bool = False,
+    parser: str = "fast",
+) -> tuple[list[QSO], Headers]:
+    """Read ADIF from a file, keeping a parsed copy in a cache file.
+
+    The cache (by default `filename` + ".cache") is used as long as
+    the size and modification time of `filename` are unchanged,
+    and with `verify_hash` also its content hash.
+    Otherwise the file is parsed and the cache rewritten.
+    The cache is a pickle, only use it for files you trust.
+    """
+    if cache_file is None:
+        cache_file = filename + ".cache"
+    key = _source_key(filename, encoding, verify_hash)
+    cached = _load_cache(cache_file, key)
+    if cached is not None:
+        return cached
+    qsos, headers = read_from_file(filename, encoding, parser)
+    _save_cache(cache_file, key, qsos, headers)
+    return (qsos, headers)
+
+
+class IncrementalReader:
+    """Read only the QSOs appended to an ADIF file since the last call.
+
+    The reader remembers the byte offset just after the last complete
+    record. `read_new` parses from there; a record still being written
+    is left for the next call.
+    If the file was replaced, truncated or rewritten (detected from
+    the inode, the size and samples of the bytes at the start of the
+    file and before the offset), the whole file is parsed again.
+    """
+
+    # Bytes compared at the start of the file and before the offset.
+    _SAMPLE = 4096
+
+    def __init__(self, filename: str, encoding: str = "UTF-8", parser: str = "fast"):
+        self.filename = filename
+        self.encoding = encoding
+        self._parse_records = _record_parser(parser)
+        self.headers = headers_from_dict({})
+        self._offset = 0
+        self._ino: Optional[int] = None
+        self._head = b""
+        self._tail = b""
+
+    def _decode(self, data: bytes) -> str:
+        # The last character may be only partly written yet.
+        return codecs.getincrementaldecoder(self.encoding)().decode(data, final=False)
+
+    def _unchanged(self, adif_file: Any, st: os.stat_result) -> bool:
+        if self._offset == 0 or st.st_ino != self._ino or st.st_size < self._offset:
+            # Nothing read yet (a header may still appear), replaced or truncated.
+            return False
+        adif_file.seek(0)
+        if adif_file.read(len(self._head)) != self._head:
+            return False
+        adif_file.seek(self._offset - len(self._tail))
+        return adif_file.read(len(self._tail)) == self._tail
+
+    def _remember(self, adif_file: Any, st: os.stat_result) -> None:
+        self._ino = st.st_ino
+        adif_file.seek(0)
+        self._head = adif_file.read(min(self._SAMPLE, self._offset))
+        start = max(0, self._offset - self._SAMPLE)
+        adif_file.seek(start)
+        self._tail = adif_file.read(self._offset - start)
+
+    def read_new(self) -> tuple[list[QSO], bool]:
+        """Return the QSOs not returned before.
+
+        The flag is True if the whole file had to be parsed,
+        in which case the list holds all QSOs of the file
+        and earlier results should be discarded.
+        """
+        with open(self.filename, "rb") as adif_file:
+            st = os.fstat(adif_file.fileno())
+            full = not self._unchanged(adif_file, st)
+            if full:
+                adif_file.seek(0)
+                adif_string = self._decode(adif_file.read())
+                adif_headers, cursor = _parse_header(adif_string)
+                self.headers = headers_from_dict(adif_headers)
+                qsos, done = self._parse_records(adif_string, cursor)
+                self._offset = len(adif_string[:done].encode(self.encoding))
+            else:
+                adif_file.seek(self._offset)
+                adif_string = self._decode(adif_file.read())
+                qsos, done = self._parse_records(adif_string, 0)
+                self._offset += len(adif_string[:done].encode(self.encoding))
+            self._remember(adif_file, st)
+        return (qsos, full)
+
+    def start_at(self, offset: Optional[int] = None, headers: Optional[Headers] = None) -> None:
+        """Take the file as already read up to the byte `offset`.
+
+        By default up to its current size. Use it after reading the file
+        in another way (e.g. with read_from_file_cached), so that
+        `read_new` returns only the QSOs appended later. `offset` must
+        be at a record boundary, e.g. the size of the file when it was
+        read.
+        """
+        with open(self.filename, "rb") as adif_file:
+            st = os.fstat(adif_file.fileno())
+            self._offset = st.st_size if offset is None else min(offset, st.st_size)
+            if headers is not None:
+                self.headers = headers
+            self._remember(adif_file, st)
+
+
+_HEADER_FIELD_RE_B = re.compile(
+    rb"<((eoh)|(\w+)\:(\d+)(\:[^>]+)?)>", re.IGNORECASE
+)
+_FIELD_RE_B = re.compile(rb"<((eor)|(\w+)\:(\d+)(\:[^>]+)?)>", re.IGNORECASE)
+
+
+def read_from_bytes(adif_bytes: Any, encoding: str = "UTF-8") -> tuple[list[QSO], Headers]:
+    """Read ADIF from a bytes-like object (bytes, bytearray, mmap).
+
+    Field lengths are taken as byte counts.
+    The QSOs returned are `LazyQSO` objects that keep a reference
+    to `adif_bytes` and decode a value only when it is accessed.
+    """
+    cursor = 0
+    adif_headers: dict[str, str] = {}
+    if len(adif_bytes) and adif_bytes[0:1] != b"<":
+        # Input has ADIF header. Headers are few, decode them right away.
+        eoh_found = False
+        while not eoh_found:
+            header_field_mo = _HEADER_FIELD_RE_B.search(adif_bytes, cursor)
+            if header_field_mo:
+                if header_field_mo.group(2):
+                    eoh_found = True
+                    cursor = header_field_mo.end(0)
+                else:
+                    field = header_field_mo.group(3).decode("ascii").upper()
+                    value_start = header_field_mo.end(0)
+                    value_end = value_start + int(header_field_mo.group(4))
+                    value = str(adif_bytes[value_start:value_end], encoding)
+                    if field in adif_headers:
+                        raise AdifDuplicateFieldError(
+                            f'Duplication in ADI header, {field} previously "{adif_headers[field]}", now "{value}".'
+                        )
+                    adif_headers[field] = value
+                    cursor = value_end
+            else:
+                raise AdifHeaderWithoutEOHError(
+                    "<EOF> marker missing after ADIF header."
+                )
+
+    qsos: list[QSO] = []
+    names: dict[bytes, str] = {}
+    # Empty fields are kept until <eor> for the duplicate check
+    one_qso: dict[str, tuple[int, int]] = {}
+    has_empty = False
+    end = len(adif_bytes)
+    field_mo = _FIELD_RE_B.search(adif_bytes, cursor)
+    while field_mo:
+        if field_mo.group(2):
+            # <eor> found:
+            if has_empty:
+                one_qso = {k: v for k, v in one_qso.items() if v[1] > v[0]}
+            qsos.append(LazyQSO(adif_bytes, one_qso, encoding))
+            one_qso = {}
+            has_empty = False
+            cursor = field_mo.end(0)
+        else:
+            # Field found:
+            raw_name = field_mo.group(3)
+            field = names.get(raw_name)
+            if field is None:
+                field = names[raw_name] = raw_name.decode("ascii").upper()
+            value_start = field_mo.end(0)
+            value_end = value_start + int(field_mo.group(4))
+            if value_end > end:
+                break
+            if field in one_qso:
+                decoded = {
+                    k: str(adif_bytes[a:b], encoding) for k, (a, b) in one_qso.items()
+                }
+                value = str(adif_bytes[value_start:value_end], encoding)
+                raise AdifDuplicateFieldError(
+                    f'Duplication in qso {decoded}, {field} previously "{decoded[field]}", now "{value}".'
+                )
+            if value_end == value_start:
+                has_empty = True
+            one_qso[field] = (value_start, value_end)
+            cursor = value_end
+        field_mo = _FIELD_RE_B.search(adif_bytes, cursor)
+
+    return (qsos, headers_from_dict(adif_headers))
+
+
+def read_from_mmap(filename: str, encoding: str = "UTF-8") -> tuple[list[QSO], Headers]:
+    """Read ADIF from a memory-mapped file, see `read_from_bytes`.
+
+    The mapping stays alive as long as any of the returned QSOs does.
+    """
+    with open(filename, "rb") as adif_file:
+        if os.fstat(adif_file.fileno()).st_size == 0:
+            return ([], headers_from_dict({}))
+        adif_map = mmap.mmap(adif_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return read_from_bytes(adif_map, encoding)
+
+
+class QsoStream:
+    """QSOs read incrementally from an ADIF file.
+
+    The headers are parsed when the stream is created and are available
+    as `headers` before the first QSO is requested.
+    Iterating yields each QSO as soon as its <EOR> has been read,
+    so memory use is bounded by `chunk_size` plus the longest record.
+    """
+
+    def __init__(
+        self,
+        adif_file: TextIO,
+        chunk_size: int = 1 << 20,
+        close: bool = False,
+        parser: str = "regex",
+    ):
+        self._parse_records = _record_parser(parser)
+        self._file = adif_file
+        self._chunk_size = chunk_size
+        self._close = close
+        self._eof = False
+        self._buf = ""
+        self._cursor = 0
+        # The header may be longer than one chunk, keep reading until
+        # its <EOH> has been seen (or the file ends).
+        while True:
+            self._fill()
+            try:
+                adif_headers, self._cursor = _parse_header(self._buf)
+                break
+            except AdifHeaderWithoutEOHError:
+                if self._eof:
+                    self.close()
+                    raise
+        self.headers = headers_from_dict(adif_headers)
+
+    def _fill(self) -> None:
+        chunk = self._file.read(self._chunk_size)
+        if chunk:
+            self._buf = self._buf[self._cursor :] + chunk
+            self._cursor = 0
+        else:
+            self._eof = True
+
+    def __iter__(self) -> Iterator[QSO]:
+        try:
+            while True:
+                qsos, self._cursor = self._parse_records(self._buf, self._cursor)
+                yield from qsos
+                if self._eof:
+                    # Whatever is left is an incomplete record.
+                    return
+                self._fill()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._close:
+            self._file.close()
+
+    def __enter__(self) -> "QsoStream":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def iter_qsos(
+    source: Union[str, "os.PathLike[str]", TextIO],
+    encoding: str = "UTF-8",
+    chunk_size: int = 1 << 20,
+    parser: str = "regex",
+) -> QsoStream:
+    """Read ADIF incrementally from a file name or an open text file.
+
+    Return a `QsoStream`: its `headers` are available immediately,
+    iterating over it yields the QSOs one by one.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return QsoStream(
+            open(source, encoding=encoding, newline=""),
+            chunk_size,
+            close=True,
+            parser=parser,
+        )
+    return QsoStream(source, chunk_size, parser=parser)
+
+
+# Fields stored as categories: few distinct values, many QSOs.
+_CATEGORICAL_FIELDS = frozenset(
+    [
+        "BAND",
+        "BAND_RX",
+        "MODE",
+        "SUBMODE",
+        "DXCC",
+        "COUNTRY",
+        "CQZ",
+        "ITUZ",
+        "CONT",
+        "STATE",
+        "PROP_MODE",
+        "STATION_CALLSIGN",
+        "OPERATOR",
+        "MY_GRIDSQUARE",
+        "QSL_RCVD",
+        "QSL_SENT",
+        "LOTW_QSL_RCVD",
+        "LOTW_QSL_SENT",
+        "EQSL_QSL_RCVD",
+        "EQSL_QSL_SENT",
+        "APP_LOTW_MODEGROUP",
+    ]
+)
+
+_DATE_FIELDS = frozenset(
+    [
+        "QSO_DATE",
+        "QSO_DATE_OFF",
+        "QSLRDATE",
+        "QSLSDATE",
+        "LOTW_QSLRDATE",
+        "LOTW_QSLSDATE",
+        "EQSL_QSLRDATE",
+        "EQSL_QSLSDATE",
+    ]
+)
+
+_TIME_FIELDS = frozenset(["TIME_ON", "TIME_OFF"])
+
+_FREQ_FIELDS = frozenset(["FREQ", "FREQ_RX"])
+
+
+class _StrColumn:
+    """Plain column, one (interned) string or None per QSO."""
+
+    def __init__(self, values: Iterable[Optional[str]] = ()):
+        self.values: list[Optional[str]] = list(values)
+
+    def append(self, value: Optional[str]) -> None:
+        self.values.append(None if value is None else sys.intern(value))
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        return self.values[i]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def select(self, wanted: set[str], rows: Iterable[int]) -> list[int]:
+        values = self.values
+        return [i for i in rows if values[i] in wanted]
+
+
+class _CategoricalColumn(_StrColumn):
+    """Column stored as integer codes into a list of categories.
+
+    Code 0 stands for a missing value.
+    """
+
+    def __init__(self) -> None:
+        self.codes = array("l")
+        self.categories: list[Optional[str]] = [None]
+        self._code_of: dict[Optional[str], int] = {None: 0}
+
+    def append(self, value: Optional[str]) -> None:
+        code = self._code_of.get(value)
+        if code is None:
+            code = self._code_of[value] = len(self.categories)
+            self.categories.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        return self.categories[self.codes[i]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def select(self, wanted: set[str], rows: Iterable[int]) -> list[int]:
+        wanted_codes = {self._code_of[v] for v in wanted if v in self._code_of}
+        codes = self.codes
+        return [i for i in rows if codes[i] in wanted_codes]
+
+    def group(self, rows: Iterable[int]) -> dict[Optional[str], list[int]]:
+        by_code: dict[int, list[int]] = {}
+        codes = self.codes
+        for i in rows:
+            by_code.setdefault(codes[i], []).append(i)
+        return {self.categories[code]: group for code, group in by_code.items()}
+
+
+class _NumberColumn(_StrColumn):
+    """Column of dates, times or frequencies stored in an `array`.
+
+    The array holds the values normalised: dates as YYYYMMDD ints,
+    times as HHMMSS ints, frequencies as floats. Values written
+    differently (TIME_ON "1234", FREQ "14.07400") are also kept as read,
+    by row, so the QSOs handed out are exactly what was appended.
+    Raises ValueError for a value that does not fit,
+    the table then falls back to a `_StrColumn`.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        # Row -> the value as read, where it differs from the normalised form
+        self.raw: dict[int, str] = {}
+        if kind == "freq":
+            self.missing: Any = math.nan
+            self.values = array("d")  # type: ignore[assignment]
+        else:
+            self.missing = -1
+            self.values = array("l")  # type: ignore[assignment]
+
+    def _convert(self, value: str) -> Any:
+        if self.kind == "freq":
+            return float(value)
+        if not value.isdigit():
+            raise ValueError(value)
+        if self.kind == "date" and len(value) == 8:
+            return int(value)
+        if self.kind == "time" and len(value) == 6:
+            return int(value)
+        if self.kind == "time" and len(value) == 4:
+            return int(value) * 100
+        raise ValueError(value)
+
+    def _format(self, v: Any) -> Optional[str]:
+        if self.kind == "freq":
+            return None if math.isnan(v) else repr(v)
+        if v < 0:
+            return None
+        return f"{v:08d}" if self.kind == "date" else f"{v:06d}"
+
+    def append(self, value: Optional[str]) -> None:
+        if value is None:
+            self.values.append(self.missing)
+            return
+        v = self._convert(value)
+        if self._format(v) != value:
+            self.raw[len(self.values)] = sys.intern(value)
+        self.values.append(v)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        value = self.raw.get(i)
+        if value is not None:
+            return value
+        return self._format(self.values[i])
+
+    def select(self, wanted: set[str], rows: Iterable[int]) -> list[int]:
+        wanted_numbers = set()
+        for v in wanted:
+            try:
+                wanted_numbers.add(self._convert(v))
+            except ValueError:
+                pass
+        values = self.values
+        return [i for i in rows if values[i] in wanted_numbers]
+
+    def group(self, rows: Iterable[int]) -> dict[Optional[str], list[int]]:
+        """Rows grouped by value, keyed by the normalised form."""
+        groups: dict[Optional[str], list[int]] = {}
+        values = self.values
+        for i in rows:
+            groups.setdefault(self._format(values[i]), []).append(i)
+        return groups
+
+
+def _new_column(field: str) -> _StrColumn:
+    if field in _CATEGORICAL_FIELDS:
+        return _CategoricalColumn()
+    if field in _DATE_FIELDS:
+        return _NumberColumn("date")
+    if field in _TIME_FIELDS:
+        return _NumberColumn("time")
+    if field in _FREQ_FIELDS:
+        return _NumberColumn("freq")
+    return _StrColumn()
+
+
+class QsoTable:
+    """QSOs stored column by column instead of one dict per QSO.
+
+    BAND, MODE, DXCC and similar fields are stored as categories,
+    dates, times and frequencies in arrays, anything else
+    as interned strings.
+    Rows can be filtered (`where`) and grouped (`group_by`) by row index
+    without building dicts; `table[i]` hands out a `QSO` for one row,
+    with the values exactly as appended (`raw_column` gives the
+    normalised storage).
+    """
+
+    def __init__(self) -> None:
+        self._columns: dict[str, _StrColumn] = {}
+        self._len = 0
+
+    @classmethod
+    def from_qsos(cls, qsos: Iterable[Mapping[str, str]]) -> "QsoTable":
+        table = cls()
+        for qso in qsos:
+            table.append(qso)
+        return table
+
+    def append(self, qso: Mapping[str, str]) -> None:
+        columns = self._columns
+        row = {key.upper(): value for key, value in qso.items() if value}
+        for field in row:
+            if field not in columns:
+                column = columns[field] = _new_column(field)
+                for _ in range(self._len):
+                    column.append(None)
+        for field, column in columns.items():
+            value = row.get(field)
+            try:
+                column.append(value)
+            except ValueError:
+                # Not what we expected for this field, keep it as strings.
+                column = columns[field] = _StrColumn(
+                    column[i] for i in range(self._len)
+                )
+                column.append(value)
+        self._len += 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int) -> QSO:
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("QsoTable index out of range")
+        return qso_from_dict(
+            {field: column[i] for field, column in self._columns.items()}
+        )
+
+    def __iter__(self) -> Iterator[QSO]:
+        for i in range(self._len):
+            yield self[i]
+
+    @property
+    def fields(self) -> list[str]:
+        return list(self._columns)
+
+    def column(self, field: str) -> list[Optional[str]]:
+        """All values of one field, None where a QSO lacks it."""
+        column = self._columns.get(field.upper())
+        if column is None:
+            return [None] * self._len
+        return [column[i] for i in range(self._len)]
+
+    def raw_column(self, field: str) -> Any:
+        """The underlying storage of one field.
+
+        An `array` of YYYYMMDD / HHMMSS ints (-1 if missing) for dates
+        and times, an `array` of floats (NaN if missing) for frequencies,
+        a `(codes, categories)` pair for categorical fields
+        and a list of strings otherwise.
+        """
+        column = self._columns[field.upper()]
+        if isinstance(column, _CategoricalColumn):
+            return column.codes, column.categories
+        return column.values
+
+    def where(self, rows: Optional[Iterable[int]] = None, **conditions: Any) -> list[int]:
+        """Row indices of QSOs matching all `conditions`.
+
+        Each condition is FIELD=value or FIELD=collection of values,
+        e.g. `table.where(BAND="20M", MODE={"FT8", "FT4"})`.
+        """
+        selected = list(range(self._len)) if rows is None else list(rows)
+        for field, wanted in conditions.items():
+            if isinstance(wanted, str):
+                wanted = {wanted}
+            column = self._columns.get(field.upper())
+            if column is None:
+                return []
+            selected = column.select({str(v) for v in wanted}, selected)
+        return selected
+
+    def group_by(
+        self, field: str, rows: Optional[Iterable[int]] = None
+    ) -> dict[Optional[str], list[int]]:
+        """Row indices grouped by the value of `field`."""
+        rows = range(self._len) if rows is None else rows
+        column = self._columns.get(field.upper())
+        if column is None:
+            return {None: list(rows)}
+        if isinstance(column, (_CategoricalColumn, _NumberColumn)):
+            return column.group(rows)
+        groups: dict[Optional[str], list[int]] = {}
+        for i in rows:
+            groups.setdefault(column[i], []).append(i)
+        return groups
+
+    def take(self, rows: Iterable[int]) -> "QsoTable":
+        """A new table holding only the given rows."""
+        return QsoTable.from_qsos(self[i] for i in rows)
+
+
+def read_table_from_file(filename: str, encoding: str = "UTF-8") -> tuple[QsoTable, Headers]:
+    """Read ADIF from a file into a `QsoTable`."""
+    with iter_qsos(filename, encoding) as qsos:
+        return (QsoTable.from_qsos(qsos), qsos.headers)
 
 
 _ONE_DAY = timedelta(days=1)
@@ -224,6 +1182,117 @@ def time_off(one_qso: QSO) -> datetime:
             return time_off_maybe + _ONE_DAY
 
 
+def _date_time_ints(
+    qsos: Union[QsoTable, Iterable[Mapping[str, str]]], date_field: str, time_field: str
+) -> tuple[Any, Any]:
+    """Dates (YYYYMMDD) and times (HHMMSS) of all QSOs as int64 arrays.
+
+    -1 marks a missing or malformed value.
+    """
+    if isinstance(qsos, QsoTable):
+        return (
+            _table_ints(qsos, date_field, False),
+            _table_ints(qsos, time_field, True),
+        )
+    qsos = qsos if isinstance(qsos, list) else list(qsos)
+    return (
+        _ints_from_strings([q.get(date_field) for q in qsos], False),
+        _ints_from_strings([q.get(time_field) for q in qsos], True),
+    )
+
+
+def _table_ints(table: QsoTable, field: str, is_time: bool) -> Any:
+    if field not in table.fields:
+        return np.full(len(table), -1, dtype=np.int64)
+    raw = table.raw_column(field)
+    if isinstance(raw, array):
+        # Already YYYYMMDD / HHMMSS ints, -1 if missing.
+        return np.array(raw, dtype=np.int64)
+    return _ints_from_strings(raw, is_time)
+
+
+def _ints_from_strings(values: list[Optional[str]], is_time: bool) -> Any:
+    def to_int(value: Optional[str]) -> int:
+        if not value or not value.isdigit():
+            return -1
+        if is_time and len(value) == 4:
+            return int(value) * 100
+        if len(value) == (6 if is_time else 8):
+            return int(value)
+        return -1
+
+    return np.fromiter((to_int(v) for v in values), dtype=np.int64, count=len(values))
+
+
+def _datetime64(dates: Any, times: Any) -> Any:
+    """Combine YYYYMMDD and HHMMSS int arrays to datetime64[s] (UTC).
+
+    Negative (missing) values and dates or times out of range
+    (month 13, February 30, minute 60...) give NaT.
+    """
+    month, day = dates // 100 % 100, dates % 100
+    hour, minute, second = times // 10000, times // 100 % 100, times % 100
+    missing = (
+        (dates < 0) | (times < 0)
+        | (month < 1) | (month > 12) | (day < 1) | (day > 31)
+        | (hour > 23) | (minute > 59) | (second > 59)
+    )
+    dates = np.where(missing, 19700101, dates)
+    times = np.where(missing, 0, times)
+    months = ((dates // 10000 - 1970) * 12 + (dates // 100 % 100 - 1)).astype(
+        "datetime64[M]"
+    )
+    days = months.astype("datetime64[D]") + (dates % 100 - 1)
+    # Days past the end of the month roll over into the next one.
+    missing |= days.astype("datetime64[M]") != months
+    seconds = times // 10000 * 3600 + times // 100 % 100 * 60 + times % 100
+    result = days.astype("datetime64[s]") + seconds
+    result[missing] = np.datetime64("NaT")
+    return result
+
+
+def _check_numpy() -> None:
+    if np is None:
+        raise ImportError("NumPy is needed for the vectorised time functions.")
+
+
+def time_on_array(
+    qsos: Union[QsoTable, Iterable[Mapping[str, str]]], epoch: bool = False
+) -> Any:
+    """Vectorised `time_on` for many QSOs.
+
+    Return a NumPy datetime64[s] array (UTC, NaT where QSO_DATE or
+    TIME_ON is missing or malformed), or with `epoch` int64 seconds
+    since 1970 (NaT becomes the minimum int64).
+    A `QsoTable` is converted straight from its date/time columns.
+    """
+    _check_numpy()
+    dates, times = _date_time_ints(qsos, "QSO_DATE", "TIME_ON")
+    result = _datetime64(dates, times)
+    return result.astype(np.int64) if epoch else result
+
+
+def time_off_array(
+    qsos: Union[QsoTable, Iterable[Mapping[str, str]]], epoch: bool = False
+) -> Any:
+    """Vectorised `time_off` for many QSOs, see `time_on_array`.
+
+    As in `time_off`, a QSO without QSO_DATE_OFF that would end
+    at or before its start is taken to end on the next day.
+    """
+    _check_numpy()
+    if not isinstance(qsos, (list, QsoTable)):
+        qsos = list(qsos)
+    on_dates, on_times = _date_time_ints(qsos, "QSO_DATE", "TIME_ON")
+    off_dates, off_times = _date_time_ints(qsos, "QSO_DATE_OFF", "TIME_OFF")
+    no_date_off = off_dates < 0
+    time_on = _datetime64(on_dates, on_times)
+    result = _datetime64(np.where(no_date_off, on_dates, off_dates), off_times)
+    wraps = no_date_off & ~(time_on < result)
+    result[wraps] += np.timedelta64(1, "D")
+    return result.astype(np.int64) if epoch else result
+
+
 def degrees_from_location(adif: str) -> float:
     """Convert an ADIF location string to degrees."""
     x = adif[0]
@@ -257,7 +1326,7 @@ def location_from_degrees(degrees: float, lat: bool) -> str:
 
 def headers_to_adif(headers: Headers) -> str:
     """Transform some headers to an ADIF string."""
-    result = ""
+    parts = []
     for key in sorted(headers.keys()):
         value = headers[key]
         if value is None:
@@ -267,12 +1336,9 @@ def headers_to_adif(headers: Headers) -> str:
             if 0 == len(value_s) or key is None or 0 == len(key):
                 pass  # Can't really happen.
             else:
-                if 0 == len(result):
-                    result = f" <{key}:{len(value_s)}>{value_s}"
-                else:
-                    result += f" <{key}:{len(value_s)}>{value_s}"
-    result += " <EOH>\n"
-    return result
+                parts.append(f" <{key}:{len(value_s)}>{value_s}")
+    parts.append(" <EOH>\n")
+    return "".join(parts)
 
 
 _ESSENTIAL_KEYS = [
@@ -286,21 +1352,18 @@ _ESSENTIAL_KEYS = [
 
 def qso_to_adif(qso: QSO) -> str:
     """Transform a qso to an ADIF string."""
-    result = ""
+    parts = []
     for key in _ESSENTIAL_KEYS:
         if key in qso:
             value = qso[key]
             if value is None:
                 pass  # Can't really happen.
             else:
-                value_s = str(value)
+                value_s = str(value).upper()
                 if 0 == len(value_s) or key is None or 0 == len(key):
                     pass  # Can't really happen.
                 else:
-                    if 0 == len(result):
-                        result = f"<{key}:{len(value_s)}>{value_s.upper()}"
-                    else:
-                        result += f" <{key}:{len(value_s)}>{value_s.upper()}"
+                    parts.append(f"<{key}:{len(value_s)}>{value_s}")
 
     for key in sorted(k for k in qso.keys() if k not in _ESSENTIAL_KEYS):
         value = qso[key]
@@ -311,38 +1374,108 @@ def qso_to_adif(qso: QSO) -> str:
             if 0 == len(value_s) or key is None or 0 == len(key):
                 pass  # Can't really happen.
             else:
-                if 0 == len(result):
-                    result = f"<{key}:{len(value_s)}>{value_s}"
-                else:
-                    result += f" <{key}:{len(value_s)}>{value_s}"
-
-    result += " <EOR>\n"
+                parts.append(f"<{key}:{len(value_s)}>{value_s}")
+
+    return " ".join(parts) + " <EOR>\n"
+
+
+def _file_header_to_adif(headers: Optional[Headers]) -> str:
+    """The header written by `write_to_file` and `AdifWriter`."""
+    if headers is None:
+        headers = Headers({})
+    parts = ["ADI file written by Python's adif_io\n"]
+    if "ADIF_VER" not in headers:
+        parts.append(" <ADIF_VER:5>3.1.6")
+    if "CREATED_TIMESTAMP" not in headers:
+        dt = datetime.now(timezone.utc).strftime("%Y%m%d %H%M%S")
+        parts.append(f" <CREATED_TIMESTAMP:{len(dt)}>{dt}")
+    if "PROGRAMID" not in headers:
+        parts.append(" <PROGRAMID:14>Python adif_io")
+    if "PROGRAMMVERSION" not in headers:
+        parts.append(f" <PROGRAMMVERSION:{len(PROGRAMM_VERSION)}>{PROGRAMM_VERSION}")
+    parts.append(headers_to_adif(headers))
+    return "".join(parts)
+
+
+class AdifWriter:
+    """Write QSOs to an ADIF file in large blocks.
+
+    Records are collected in a list and written with one `write` call
+    per `buffer_size` characters.
+    `target` is a file name or an open text file.
+    With `compress` (by default: if the file name ends in ".gz")
+    the output is gzip-compressed.
+    The header is written when the writer is created.
+    """
 
-    return result
+    def __init__(
+        self,
+        target: Union[str, "os.PathLike[str]", TextIO],
+        headers: Optional[Headers] = None,
+        encoding: str = "UTF-8",
+        compress: Optional[bool] = None,
+        buffer_size: int = 1 << 20,
+    ):
+        if isinstance(target, (str, os.PathLike)):
+            if compress is None:
+                compress = os.fspath(target).endswith(".gz")
+            if compress:
+                self._file: TextIO = gzip.open(target, "wt", encoding=encoding)
+            else:
+                self._file = open(target, "w", encoding=encoding)
+            self._close = True
+        else:
+            self._file = target
+            self._close = False
+        self._buffer_size = buffer_size
+        self._parts: list[str] = [_file_header_to_adif(headers)]
+        self._pending = len(self._parts[0])
+
+    def write(self, qso: QSO) -> None:
+        record = qso_to_adif(qso)
+        self._parts.append(record)
+        self._pending += len(record)
+        if self._pending >= self._buffer_size:
+            self.flush()
+
+    def write_all(self, qsos: Iterable[QSO]) -> None:
+        parts = self._parts
+        pending = self._pending
+        buffer_size = self._buffer_size
+        for qso in qsos:
+            record = qso_to_adif(qso)
+            parts.append(record)
+            pending += len(record)
+            if pending >= buffer_size:
+                self._file.write("".join(parts))
+                parts.clear()
+                pending = 0
+        self._pending = pending
+
+    def flush(self) -> None:
+        if self._parts:
+            self._file.write("".join(self._parts))
+            self._parts.clear()
+        self._pending = 0
+        self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self._close:
+            self._file.close()
+
+    def __enter__(self) -> "AdifWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
 
 def write_to_file(
     filename: str,
-    qsos: list[QSO],
+    qsos: Iterable[QSO],
     headers: Optional[Headers] = None,
     encoding: str = "UTF-8",
 ) -> None:
-    with open(filename, encoding=encoding) as adif_file:
-        adif_file.write("ADI file written by Python's adif_io\n")
-        if headers is None:
-            headers = Headers({})
-        if "ADIF_VER" not in headers:
-            adif_file.write(" <ADIF_VER:5>3.1.6")
-        if "CREATED_TIMESTAMP" not in headers:
-            dt = datetime.utcnow().strftime("%Y%m%d %H%M%S")
-            adif_file.write(f" <CREATED_TIMESTAMP:{len(dt)}>{dt}")
-        if "PROGRAMID" not in headers:
-            adif_file.write(" <PROGRAMID:14>Python adif_io")
-        if "PROGRAMMVERSION" not in headers:
-            adif_file.write(
-                f" <PROGRAMMVERSION:{len(PROGRAMM_VERSION)}>{PROGRAMM_VERSION}"
-            )
-        adif_file.write(headers_to_adif(headers))
-
-        for qso in qsos:
-            adif_file.write(qso_to_adif(qso))
+    with AdifWriter(filename, headers, encoding) as writer:
+        writer.write_all(qsos)
@@ -0,0 +1,98 @@
+# This is a PUBLIC DOMAIN (CC0) code for suppressing repeated alerts
+# of the PSK watchers.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""De-duplication and rate limiting of spot alerts.
+
+A station calling CQ is spotted by many receivers within seconds,
+each spot would trigger the same WAZ/DXCC/CHLG alert. An alert for
+(call, band, kind) is passed once and then suppressed for the window
+configured for that kind.
+
+All keys of one kind share the same window, so keeping them in an
+OrderedDict in insertion order also keeps them in order of expiry:
+expired keys are always at the front and are removed in O(1) each.
+Optionally, the number of alerts of a kind per period can be limited
+(sliding window), to keep a band opening from flooding the outputs.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+
+class AlertDeduplicator:
+    """Decide whether an alert should be raised.
+
+    `windows` maps alert kind -> suppression window in seconds
+    (`default_window` for other kinds); `rate_limits` maps kind ->
+    (max alerts, period in seconds).
+    """
+
+    def __init__(
+        self,
+        windows: Optional[dict[str, float]] = None,
+        default_window: float = 600.0,
+        rate_limits: Optional[dict[str, tuple[int, float]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.windows = dict(windows or {})
+        self.default_window = default_window
+        self.rate_limits = dict(rate_limits or {})
+        self.clock = clock
+        # kind -> OrderedDict of (call, band) -> expiry time
+        self._seen: dict[str, OrderedDict] = {}
+        # kind -> times of the alerts passed within the rate limit period
+        self._passed: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self.passed = 0
+        self.duplicates = 0
+        self.rate_limited = 0
+
+    def should_alert(
+        self, call: str, band: str, kind: str, now: Optional[float] = None
+    ) -> bool:
+        """True for the first alert of (call, band, kind) within its window."""
+        if now is None:
+            now = self.clock()
+        key = (call.strip().upper(), band.upper())
+        with self._lock:
+            seen = self._seen.get(kind)
+            if seen is None:
+                seen = self._seen[kind] = OrderedDict()
+            while seen:
+                first = next(iter(seen.values()))
+                if first > now:
+                    break
+                seen.popitem(last=False)
+            if key in seen:
+                self.duplicates += 1
+                return False
+
+            limit = self.rate_limits.get(kind)
+            if limit is not None:
+                max_alerts, period = limit
+                passed = self._passed.setdefault(kind, deque())
+                while passed and passed[0] <= now - period:
+                    passed.popleft()
+                if len(passed) >= max_alerts:
+                    # Not remembered: it may pass once the rate drops.
+                    self.rate_limited += 1
+                    return False
+                passed.append(now)
+
+            seen[key] = now + self.windows.get(kind, self.default_window)
+            self.passed += 1
+            return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(seen) for seen in self._seen.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "passed": self.passed,
+                "duplicates": self.duplicates,
+                "rate_limited": self.rate_limited,
+            }
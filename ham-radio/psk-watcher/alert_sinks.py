@@ -0,0 +1,214 @@
+# This is a PUBLIC DOMAIN (CC0) code for storing the alerts
+# of the PSK watchers.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Buffered destinations of the alerts.
+
+Writing and flushing a file for every alert costs a few syscalls
+each, and a band opening brings hundreds of alerts. The sinks collect
+the alerts in memory and write them out when `flush_bytes` are
+buffered, or at the latest `flush_interval` seconds after the first
+buffered one (checked by a SinkFlusher thread), and on close.
+
+    TextFileSink  - the report lines, as the watchers always wrote them,
+                    optionally rotated at `rotate_bytes`
+    JsonlSink     - one JSON object per alert (see Spot.record)
+    SqliteSink    - rows of the "alerts" table, for later queries
+
+    sink = JsonlSink("alerts.jsonl")
+    flusher = SinkFlusher([sink])
+    sink.write(record, line)
+    ...
+    flusher.stop(); sink.close()
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+
+_SQLITE_COLUMNS = (
+    "time", "rule", "call", "band", "mode", "snr", "freq", "grid", "rx_call", "rx_grid",
+)
+
+
+class BufferedSink(ABC):
+    """Collect formatted alerts, write them out in batches.
+
+    Subclasses define _format (the item buffered for an alert) and
+    _write_items (write a batch of them), and _size if the items are
+    not strings.
+    """
+
+    def __init__(self, flush_bytes: int = 64 << 10, flush_interval: float = 5.0):
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.flushes = 0
+        self._buffer: list = []
+        self._buffered = 0
+        self._first: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _format(self, record: dict, line: str):
+        """The item to buffer for an alert."""
+
+    def _size(self, item) -> int:
+        return len(item)
+
+    @abstractmethod
+    def _write_items(self, items: list) -> None:
+        """Write out a batch of the buffered items."""
+
+    def write(self, record: dict, line: str) -> None:
+        item = self._format(record, line)
+        with self._lock:
+            if self._first is None:
+                self._first = time.monotonic()
+            self._buffer.append(item)
+            self._buffered += self._size(item)
+            if self._buffered >= self.flush_bytes:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        items, self._buffer = self._buffer, []
+        self._buffered = 0
+        self._first = None
+        self._write_items(items)
+        self.written += len(items)
+        self.flushes += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def flush_if_due(self, now: Optional[float] = None) -> None:
+        """Flush if the oldest buffered alert waits longer than flush_interval."""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            if self._first is not None and now - self._first >= self.flush_interval:
+                self._flush_locked()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class TextFileSink(BufferedSink):
+    """Report lines in a text file, rotated like logging's RotatingFileHandler.
+
+    With `rotate_bytes`, a file that would grow beyond it is renamed to
+    path.1 (path.1 to path.2 and so on, up to `backups`) first.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        append: bool = False,
+        rotate_bytes: int = 0,
+        backups: int = 5,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.rotate_bytes = rotate_bytes
+        self.backups = backups
+        self._file = open(path, "at" if append else "wt", encoding="utf-8")
+
+    def _format(self, record: dict, line: str) -> str:
+        return line + "\n"
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, self.path + ".1")
+        self._file = open(self.path, "wt", encoding="utf-8")
+
+    def _write_items(self, items: list) -> None:
+        data = "".join(items)
+        if self.rotate_bytes and self._file.tell() > 0:
+            if self._file.tell() + len(data) > self.rotate_bytes:
+                self._rotate()
+        self._file.write(data)
+        self._file.flush()
+
+    def close(self) -> None:
+        super().close()
+        self._file.close()
+
+
+class JsonlSink(TextFileSink):
+    """One JSON object per alert; appended to by default."""
+
+    def __init__(self, path: str, append: bool = True, **kwargs):
+        super().__init__(path, append=append, **kwargs)
+
+    def _format(self, record: dict, line: str) -> str:
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+class SqliteSink(BufferedSink):
+    """Alerts as rows of the "alerts" table, inserted one batch per transaction."""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        # Only used under the lock of the sink, from whichever thread flushes
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            "time REAL, rule TEXT, call TEXT, band TEXT, mode TEXT, snr INTEGER,"
+            " freq INTEGER, grid TEXT, rx_call TEXT, rx_grid TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS alerts_call ON alerts (call)")
+        self._db.commit()
+
+    def _format(self, record: dict, line: str) -> tuple:
+        return tuple(record.get(column) for column in _SQLITE_COLUMNS)
+
+    def _size(self, item) -> int:
+        return 100  # Roughly, the size threshold is about the number of rows
+
+    def _write_items(self, items: list) -> None:
+        with self._db:
+            self._db.executemany(
+                f"INSERT INTO alerts ({', '.join(_SQLITE_COLUMNS)})"
+                f" VALUES ({', '.join('?' * len(_SQLITE_COLUMNS))})",
+                items,
+            )
+
+    def close(self) -> None:
+        super().close()
+        self._db.close()
+
+
+class SinkFlusher:
+    """Thread flushing the sinks whose oldest alert waits too long."""
+
+    def __init__(self, sinks: Iterable[BufferedSink], interval: float = 1.0):
+        self.sinks = list(sinks)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._work, name="sink-flusher", daemon=True)
+        self._thread.start()
+
+    def _work(self) -> None:
+        while not self._stop.wait(self.interval):
+            for sink in self.sinks:
+                try:
+                    sink.flush_if_due()
+                except Exception as e:
+                    print("⚠ Writing of the alerts failed:", e)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
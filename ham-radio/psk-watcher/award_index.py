@@ -0,0 +1,160 @@
+# This is a PUBLIC DOMAIN (CC0) code for tracking the award progress
+# (DXCC, WAZ, WAS, grids, DXCC challenge) of a log read with adif_io.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Index of entities, zones, states and grids worked per band and mode.
+
+Each worked value gets a bit number; for every (kind, band, mode)
+combination the index keeps one Python int used as a bitset,
+with None standing for "any band" / "any mode".
+So "is this new for 20M FT8" is a dict lookup and a bit test.
+
+    awards = AwardIndex.from_qsos(qsos, resolver=ci.get_all)
+    if awards.is_new("CQZ", 3, band="20M"):
+        ...
+"""
+from typing import Callable, Iterable, Mapping, Optional
+
+# Kinds of values tracked and the ADIF field they come from.
+KINDS = {
+    "DXCC": "DXCC",
+    "CQZ": "CQZ",
+    "ITUZ": "ITUZ",
+    "STATE": "STATE",
+    "GRID": "GRIDSQUARE",
+}
+
+# Kinds that may be looked up from the callsign if the QSO lacks them,
+# with the corresponding key of a pyhamtools Callinfo.get_all() result.
+RESOLVED_KINDS = {
+    "DXCC": "adif",
+    "CQZ": "cqz",
+    "ITUZ": "ituz",
+}
+
+
+def normalize(kind: str, value) -> Optional[str]:
+    """The form in which a value of the given kind is stored."""
+    if value is None:
+        return None
+    value = str(value).strip().upper()
+    if not value:
+        return None
+    if kind in RESOLVED_KINDS and value.isdigit():
+        return str(int(value))  # "05" and 5 are the same zone
+    if kind == "GRID":
+        return value[:4]
+    return value
+
+
+def qso_mode(qso: Mapping[str, str]) -> str:
+    """The mode as reported by spotting networks (FT4 is a SUBMODE of MFSK)."""
+    return (qso.get("SUBMODE") or qso.get("MODE") or "").upper()
+
+
+class AwardIndex:
+    """What has been worked, per award kind, band and mode.
+
+    `resolver` is called with a callsign when a QSO lacks DXCC, CQZ or
+    ITUZ and should return a dict like pyhamtools' Callinfo.get_all();
+    it may raise or return None for unknown calls.
+    QSOs on `skipped_bands` (e.g. 60M, not valid for DXCC) are ignored.
+    """
+
+    def __init__(
+        self,
+        resolver: Optional[Callable[[str], Optional[dict]]] = None,
+        skipped_bands: Iterable[str] = (),
+    ):
+        self.resolver = resolver
+        self.skipped_bands = {b.upper() for b in skipped_bands}
+        self._bit_of: dict[str, dict[str, int]] = {kind: {} for kind in KINDS}
+        self._values: dict[str, list[str]] = {kind: [] for kind in KINDS}
+        self._bits: dict[tuple[str, Optional[str], Optional[str]], int] = {}
+
+    @classmethod
+    def from_qsos(cls, qsos: Iterable[Mapping[str, str]], **kwargs) -> "AwardIndex":
+        index = cls(**kwargs)
+        index.add_all(qsos)
+        return index
+
+    def copy(self) -> "AwardIndex":
+        index = AwardIndex(self.resolver, self.skipped_bands)
+        index._bit_of = {kind: dict(bits) for kind, bits in self._bit_of.items()}
+        index._values = {kind: list(values) for kind, values in self._values.items()}
+        index._bits = dict(self._bits)
+        return index
+
+    def _bit(self, kind: str, value: str) -> int:
+        bit_of = self._bit_of[kind]
+        bit = bit_of.get(value)
+        if bit is None:
+            bit = bit_of[value] = len(self._values[kind])
+            self._values[kind].append(value)
+        return bit
+
+    def _resolve(self, call: Optional[str]) -> Optional[dict]:
+        if self.resolver is None or not call:
+            return None
+        try:
+            return self.resolver(call)
+        except Exception:
+            return None
+
+    def values_of(self, qso: Mapping[str, str]) -> dict[str, str]:
+        """The award values credited by one QSO, by kind."""
+        found = {}
+        info = None
+        for kind, field in KINDS.items():
+            value = normalize(kind, qso.get(field))
+            if value is None and kind in RESOLVED_KINDS:
+                if info is None:
+                    info = self._resolve(qso.get("CALL")) or {}
+                value = normalize(kind, info.get(RESOLVED_KINDS[kind]))
+            if value is not None:
+                found[kind] = value
+        return found
+
+    def add(self, qso: Mapping[str, str]) -> None:
+        """Credit one QSO."""
+        band = (qso.get("BAND") or "").upper()
+        if band in self.skipped_bands:
+            return
+        mode = qso_mode(qso)
+        bits = self._bits
+        for kind, value in self.values_of(qso).items():
+            mask = 1 << self._bit(kind, value)
+            for key in (
+                (kind, None, None),
+                (kind, band, None),
+                (kind, None, mode),
+                (kind, band, mode),
+            ):
+                bits[key] = bits.get(key, 0) | mask
+
+    def add_all(self, qsos: Iterable[Mapping[str, str]]) -> None:
+        for qso in qsos:
+            self.add(qso)
+
+    def has(
+        self, kind: str, value, band: Optional[str] = None, mode: Optional[str] = None
+    ) -> bool:
+        """Whether `value` has been worked, overall or on a band and/or mode."""
+        bit = self._bit_of[kind].get(normalize(kind, value))
+        if bit is None:
+            return False
+        key = (kind, band.upper() if band else None, mode.upper() if mode else None)
+        return bool(self._bits.get(key, 0) >> bit & 1)
+
+    def is_new(
+        self, kind: str, value, band: Optional[str] = None, mode: Optional[str] = None
+    ) -> bool:
+        return not self.has(kind, value, band, mode)
+
+    def worked(
+        self, kind: str, band: Optional[str] = None, mode: Optional[str] = None
+    ) -> set[str]:
+        """All values of a kind worked, overall or on a band and/or mode."""
+        key = (kind, band.upper() if band else None, mode.upper() if mode else None)
+        bits = self._bits.get(key, 0)
+        return {v for i, v in enumerate(self._values[kind]) if bits >> i & 1}
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# This is a PUBLIC DOMAIN (CC0) benchmark for the adif_io extensions
+# used by the PSK watchers.
+# It works on a synthetic log, so no real ADIF file is needed.
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import adif_io as af
+
+BANDS = ["160M", "80M", "40M", "30M", "20M", "17M", "15M", "12M", "10M", "6M"]
+MODES = ["FT8", "FT4", "CW", "SSB", "RTTY"]
+
+
+def synthetic_qsos(n, seed=1):
+    """Generate n LoTW-like QSO dicts."""
+    rnd = random.Random(seed)
+    for i in range(n):
+        band = rnd.choice(BANDS)
+        yield {
+            "CALL": f"{rnd.choice(['SP', 'DL', 'K', 'JA', 'VK'])}{i % 10}{i:X}",
+            "BAND": band,
+            "MODE": rnd.choice(MODES),
+            "FREQ": f"{rnd.uniform(1.8, 54.0):.5f}",
+            "QSO_DATE": f"20{rnd.randint(10, 25)}{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}",
+            "TIME_ON": f"{rnd.randint(0, 23):02d}{rnd.randint(0, 59):02d}{rnd.randint(0, 59):02d}",
+            "DXCC": str(rnd.randint(1, 520)),
+            "QSL_RCVD": rnd.choice("YN"),
+            # A few records carry text that looks like ADIF markup.
+            "NOTES": "discussed the <eor> marker" if i % 1000 == 0 else "",
+        }
+
+
+def synthetic_adif(n):
+    header = "Synthetic log <ADIF_VER:5>3.1.6 <PROGRAMID:5>bench <EOH>\n"
+    return header + "".join(af.qso_to_adif(af.qso_from_dict(q)) for q in synthetic_qsos(n))
+
+
+def bench_parsers(adif_string):
+    fields = None
+    for parser in ("regex", "fast"):
+        t0 = time.perf_counter()
+        qsos, _ = af.read_from_string(adif_string, parser=parser)
+        dt = time.perf_counter() - t0
+        if fields is None:
+            fields = sum(len(q) for q in qsos)
+        print(f"{parser:>8}: {len(qsos)} QSOs, {fields} fields in {dt:.2f} s, "
+              f"{fields / dt:,.0f} fields/s")
+
+
+def bench_writer(qsos):
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("bench.adi", "bench.adi.gz"):
+            filename = os.path.join(tmp, name)
+            t0 = time.perf_counter()
+            af.write_to_file(filename, qsos)
+            dt = time.perf_counter() - t0
+            size = os.path.getsize(filename)
+            print(f"{name:>14}: {len(qsos)} QSOs written in {dt:.2f} s, "
+                  f"{len(qsos) / dt:,.0f} QSOs/s, {size / 1e6:.1f} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark adif_io on a synthetic log")
+    ap.add_argument("--qsos", type=int, default=1_000_000, help="number of QSOs")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    adif_string = synthetic_adif(args.qsos)
+    print(f"Generated {len(adif_string) / 1e6:.1f} MB of ADIF "
+          f"in {time.perf_counter() - t0:.2f} s")
+    bench_parsers(adif_string)
+    bench_writer([af.qso_from_dict(q) for q in synthetic_qsos(args.qsos)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# This is a PUBLIC DOMAIN (CC0) code for caching callsign lookups
+# done by the PSK watchers.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Memoizing front end for callsign -> entity lookups.
+
+pskreporter keeps reporting the same few thousand stations, so
+the result of e.g. pyhamtools' Callinfo.get_all is kept in a bounded
+LRU cache with a time-to-live. Calls that cannot be resolved are
+cached too (for a shorter time), so that a busted call spotted
+again and again does not cost a full lookup each time.
+
+    resolver = CallResolver(Callinfo(LookupLib(lookuptype="countryfile")).get_all)
+    info = resolver.resolve("SP5DAA")   # None if unknown
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# Exceptions meaning "this call is unknown" rather than "lookup broken".
+# pyhamtools raises KeyError for calls it cannot resolve.
+NOT_FOUND_ERRORS = (KeyError, ValueError)
+
+
+class CallResolver:
+    """Bounded LRU cache with TTL and negative caching around `lookup`.
+
+    `lookup(call)` returns a dict (e.g. with 'adif', 'cqz', 'ituz')
+    or raises one of NOT_FOUND_ERRORS for unknown calls.
+    The returned dicts are shared, callers must not modify them.
+    Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[str], dict],
+        maxsize: int = 20000,
+        ttl: float = 6 * 3600,
+        negative_ttl: float = 600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.lookup = lookup
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        # call -> (expiry time, info or None)
+        self._cache: OrderedDict[str, tuple[float, Optional[dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resolve(self, call: str) -> Optional[dict]:
+        """Info for `call`, or None if it cannot be resolved."""
+        call = call.strip().upper()
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.get(call)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(call)
+                if entry[1] is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # The lookup itself runs without the lock held.
+        try:
+            info: Optional[dict] = self.lookup(call)
+        except NOT_FOUND_ERRORS:
+            info = None
+        expiry = now + (self.ttl if info is not None else self.negative_ttl)
+
+        with self._lock:
+            self._cache[call] = (expiry, info)
+            self._cache.move_to_end(call)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return info
+
+    def __call__(self, call: str) -> dict:
+        """Like `lookup`: raise KeyError for unknown calls."""
+        info = self.resolve(call)
+        if info is None:
+            raise KeyError(call)
+        return info
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "size": len(self._cache),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,165 @@
+# This is a PUBLIC DOMAIN (CC0) code for sending the watcher alerts
+# over Jabber (XMPP) through one long-lived connection.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Persistent XMPP session for notifications.
+
+Logging in to the Jabber server (TLS, SASL, roster) takes much longer
+than sending a message, so one session per account is kept open
+in an asyncio loop running in its own thread, and re-established
+after a disconnection.
+Texts passed to `send` within `window` seconds are sent as one message,
+so a band opening does not produce a flood of messages.
+
+    jabber = JabberNotifier(jcreds.jid, jcreds.password, jcreds.target)
+    jabber.send("DXCC ...")    # returns immediately, from any thread
+    ...
+    jabber.close()
+"""
+import asyncio
+import inspect
+import threading
+from typing import Optional
+
+import slixmpp
+
+
+class _Client(slixmpp.ClientXMPP):
+    def __init__(self, jid: str, password: str):
+        super().__init__(jid, password)
+        self.ready = asyncio.Event()
+        self.add_event_handler("session_start", self._start)
+        self.add_event_handler("disconnected", self._disconnected)
+
+    async def _start(self, event):
+        self.send_presence()
+        await self.get_roster()
+        self.ready.set()
+
+    def _disconnected(self, event):
+        self.ready.clear()
+
+
+class JabberNotifier:
+    """Send texts to `target` through one XMPP session of `jid`.
+
+    Without `loop`, a private event loop is run in a daemon thread;
+    with `loop`, the notifier runs as a task of that (running) loop.
+    """
+
+    def __init__(
+        self,
+        jid: str,
+        password: str,
+        target: str,
+        window: float = 5.0,
+        reconnect_delay: float = 10.0,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.jid = jid
+        self.password = password
+        self.target = target
+        self.window = window
+        self.reconnect_delay = reconnect_delay
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+        self._client: Optional[_Client] = None
+        self._thread = None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=loop.run_forever, name=f"jabber-{jid}", daemon=True
+            )
+            self._thread.start()
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.run_coroutine_threadsafe(self._run(), loop)
+
+    def send(self, text: str) -> None:
+        """Queue a text for sending; safe to call from any thread."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, text)
+
+    def _drop_client(self, client: _Client) -> None:
+        """Forget the client and stop it, also its retries in the background."""
+        if self._client is client:
+            self._client = None
+        try:
+            client.cancel_connection_attempt()
+        except Exception:
+            pass
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+
+    async def _connect(self) -> _Client:
+        """Return a client with an established session, retrying forever."""
+        while True:
+            client = self._client
+            if client is not None:
+                if client.ready.is_set():
+                    return client
+                self._drop_client(client)  # The session was lost
+            try:
+                client = self._client = _Client(self.jid, self.password)
+                client.loop = asyncio.get_running_loop()
+                maybe = client.connect()
+                ok = await maybe if inspect.isawaitable(maybe) else maybe
+                if ok is False:
+                    raise RuntimeError("I couldn't connect to the Jabber server (False returned).")
+                await asyncio.wait_for(client.ready.wait(), timeout=60)
+                return client
+            except Exception as e:
+                print(f"⚠ Jabber connection for {self.jid} failed:", e)
+                # slixmpp would keep retrying, next to the new client
+                if client is not None:
+                    self._drop_client(client)
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            texts = [await self._queue.get()]
+            # Collect whatever else arrives within the window.
+            deadline = loop.time() + self.window
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    texts.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            body = "\n".join(t.rstrip("\n") for t in texts)
+            client = await self._connect()
+            try:
+                client.send_message(mto=self.target, mbody=body, mtype="chat")
+            except Exception as e:
+                # Drop the batch and the session, the next batch reconnects.
+                print(f"⚠ Jabber message from {self.jid} not sent:", e)
+                self.failed += 1
+                self._drop_client(client)
+                continue
+            self.sent += 1
+            self.coalesced += len(texts) - 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Disconnect and stop the private loop (queued texts may be lost)."""
+        self._task.cancel()
+        if self._thread is None:
+            # On the caller's loop, possibly called from it: do not wait.
+            if self._client is not None:
+                self._loop.call_soon_threadsafe(self._client.disconnect)
+            return
+
+        async def stop():
+            if self._client is not None:
+                self._client.disconnect()
+
+        try:
+            asyncio.run_coroutine_threadsafe(stop(), self._loop).result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
@@ -0,0 +1,99 @@
+# This is a PUBLIC DOMAIN (CC0) code for following the changes
+# of the confirmed-QSO log while a watcher is running.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Background reload of the award index from the ADIF log.
+
+The first index is built from adif_io.read_from_file_cached, so
+a start with an unchanged log needs no parsing. A thread then polls
+the log file (size, mtime, inode). When it changes, only the appended
+QSOs are read (adif_io.IncrementalReader, started where the first read
+ended) and added to a copy of the current index; if the file was
+rewritten (e.g. a new LoTW download), the index is built from
+scratch. The new index then replaces the old one with a single
+attribute assignment, so spot processing never waits for a reload
+and never sees a half-updated index: read `reloader.awards` once per
+spot and use that.
+
+    reloader = LogReloader("lotwreport.adi", resolver=resolver)
+    ...
+    awards = reloader.awards
+"""
+import os
+import threading
+from typing import Callable, Iterable, Optional
+
+import adif_io as af
+from award_index import AwardIndex
+
+
+class LogReloader:
+    """Keep `awards` up to date with `filename`, checked every `interval` s."""
+
+    def __init__(
+        self,
+        filename: str,
+        resolver: Optional[Callable[[str], Optional[dict]]] = None,
+        skipped_bands: Iterable[str] = (),
+        interval: float = 60.0,
+        encoding: str = "UTF-8",
+    ):
+        self.filename = filename
+        self.resolver = resolver
+        self.skipped_bands = tuple(skipped_bands)
+        self.interval = interval
+        self.reloads = 0
+        self.added = 0
+        self._reader = af.IncrementalReader(filename, encoding)
+        # The stat first: what is appended during the read is then read
+        # again by check() (adding a QSO twice changes nothing)
+        self._stat = self._file_stat()
+        qsos, headers = af.read_from_file_cached(filename, encoding)
+        self._reader.start_at(self._stat[1], headers)
+        self.awards = AwardIndex.from_qsos(
+            qsos, resolver=resolver, skipped_bands=self.skipped_bands
+        )
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._work, name="log-reloader", daemon=True)
+        self._thread.start()
+
+    def _file_stat(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def check(self) -> bool:
+        """Reload if the file changed, return True if the index was replaced."""
+        stat = self._file_stat()
+        if stat is None or stat == self._stat:
+            return False
+        self._stat = stat
+        qsos, full = self._reader.read_new()
+        if full:
+            # The file was rewritten: start from scratch.
+            awards = AwardIndex.from_qsos(
+                qsos, resolver=self.resolver, skipped_bands=self.skipped_bands
+            )
+        elif qsos:
+            awards = self.awards.copy()
+            awards.add_all(qsos)
+        else:
+            return False
+        self.awards = awards  # The swap, readers see the old or the new index
+        self.reloads += 1
+        self.added += len(qsos)
+        print(f"🔄 Log {self.filename} reloaded ({len(qsos)} QSOs read)")
+        return True
+
+    def _work(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠ Reloading of {self.filename} failed:", e)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
@@ -0,0 +1,204 @@
+# This is a PUBLIC DOMAIN (CC0) code for fast callsign -> DXCC/zone lookups
+# from the country files (https://www.country-files.com/).
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Prefix trie of the cty.csv country file.
+
+The trie is built once from cty.csv and saved next to it, so later
+starts only unpickle it. A lookup walks the trie along the callsign
+and keeps the longest prefix found; exact calls ("=" entries of the
+country file) are checked first. The result is a dict with the same
+keys as pyhamtools' Callinfo.get_all():
+country, adif, cqz, ituz, continent, latitude, longitude.
+
+    trie = PrefixTrie.load_or_build("cty.csv")
+    trie.lookup("SP5DAA")["cqz"]   # 15
+"""
+import csv
+import os
+import pickle
+import re
+from typing import Iterable, Optional
+
+# Suffixes that do not change the DXCC entity.
+IGNORED_SUFFIXES = {"P", "M", "QRP", "QRPP", "A", "B", "LH", "J", "X", "R", "T"}
+
+# Suffixes of stations that are not in any DXCC entity.
+NO_ENTITY_SUFFIXES = {"MM", "AM"}
+
+_PREFIX_RE = re.compile(r"^(=?)([A-Z0-9/]+)(.*)$")
+_OVERRIDE_RES = {
+    "cqz": re.compile(r"\((\d+)\)"),
+    "ituz": re.compile(r"\[(\d+)\]"),
+    "latlon": re.compile(r"<([-+\d.]+)/([-+\d.]+)>"),
+    "continent": re.compile(r"\{(\w+)\}"),
+}
+
+# Key of the entity info stored in a trie node (never a callsign character).
+_INFO = ""
+
+
+def _parse_entry(token: str, entity: dict) -> Optional[tuple[bool, str, dict]]:
+    """Parse one prefix of cty.csv, e.g. "=K1ABC(4)[7]"."""
+    mo = _PREFIX_RE.match(token.strip())
+    if mo is None:
+        return None
+    exact, prefix, overrides = mo.groups()
+    info = entity
+    if overrides:
+        info = dict(entity)
+        for key, regex in _OVERRIDE_RES.items():
+            omo = regex.search(overrides)
+            if omo is None:
+                continue
+            if key == "latlon":
+                info["latitude"] = float(omo.group(1))
+                info["longitude"] = -float(omo.group(2))
+            elif key == "continent":
+                info["continent"] = omo.group(1)
+            else:
+                info[key] = int(omo.group(1))
+    return bool(exact), prefix, info
+
+
+class PrefixTrie:
+    """Longest-prefix matcher for callsigns, see the module docstring."""
+
+    def __init__(self) -> None:
+        self._root: dict = {}
+        self._exact: dict[str, dict] = {}
+
+    # ---------- building ----------
+
+    def add(self, prefix: str, info: dict, exact: bool = False) -> None:
+        if exact:
+            self._exact[prefix] = info
+            return
+        node = self._root
+        for ch in prefix:
+            node = node.setdefault(ch, {})
+        node[_INFO] = info
+
+    @classmethod
+    def from_cty_csv(cls, filename: str) -> "PrefixTrie":
+        """Build from cty.csv.
+
+        Each line: primary prefix, country, ADIF entity number,
+        continent, CQ zone, ITU zone, latitude, longitude (positive
+        towards West, as in cty.dat), UTC offset, prefixes ending in ";".
+        """
+        trie = cls()
+        with open(filename, newline="", encoding="latin-1") as cty:
+            for row in csv.reader(cty):
+                if len(row) < 10:
+                    continue
+                entity = {
+                    "country": row[1],
+                    "adif": int(row[2]),
+                    "continent": row[3],
+                    "cqz": int(row[4]),
+                    "ituz": int(row[5]),
+                    "latitude": float(row[6]),
+                    "longitude": -float(row[7]),
+                }
+                for token in row[9].rstrip(";").split():
+                    entry = _parse_entry(token, entity)
+                    if entry is not None:
+                        exact, prefix, info = entry
+                        trie.add(prefix, info, exact)
+        return trie
+
+    def save(self, filename: str) -> None:
+        tmp_file = filename + ".tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump((self._root, self._exact), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, filename)
+
+    @classmethod
+    def load(cls, filename: str) -> "PrefixTrie":
+        trie = cls()
+        with open(filename, "rb") as f:
+            trie._root, trie._exact = pickle.load(f)
+        return trie
+
+    @classmethod
+    def load_or_build(cls, cty_csv: str, trie_file: Optional[str] = None) -> "PrefixTrie":
+        """Load the saved trie, rebuilding it if cty.csv is newer."""
+        if trie_file is None:
+            trie_file = cty_csv + ".trie"
+        try:
+            if os.path.getmtime(trie_file) >= os.path.getmtime(cty_csv):
+                return cls.load(trie_file)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+        trie = cls.from_cty_csv(cty_csv)
+        try:
+            trie.save(trie_file)
+        except OSError:
+            pass
+        return trie
+
+    # ---------- lookups ----------
+
+    def _longest_prefix(self, call: str) -> Optional[dict]:
+        node = self._root
+        found = None
+        for ch in call:
+            node = node.get(ch)
+            if node is None:
+                break
+            found = node.get(_INFO, found)
+        return found
+
+    @staticmethod
+    def _lookup_key(call: str) -> Optional[str]:
+        """What to look up for a call with "/" in it.
+
+        DL/SP5DAA and SP5DAA/DL are looked up as DL, W1AW/4 as W4AW,
+        SP5DAA/P as SP5DAA; /MM and /AM are in no entity (None),
+        and neither is a call made only of slashes.
+        """
+        parts = [p for p in call.split("/") if p]
+        if not parts:
+            return None
+        if len(parts) > 1 and parts[-1] in NO_ENTITY_SUFFIXES:
+            return None
+        parts = [p for p in parts if p not in IGNORED_SUFFIXES] or parts[:1]
+        if len(parts) == 1:
+            return parts[0]
+        if len(parts) == 2 and len(parts[1]) == 1 and parts[1].isdigit():
+            # New call area: replace the digit of the home call.
+            home = parts[0]
+            for i, ch in enumerate(home):
+                if ch.isdigit():
+                    return home[:i] + parts[1] + home[i + 1 :]
+            return home
+        # A prefix added to the home call: the shorter part.
+        return min(parts[:2], key=len)
+
+    def lookup(self, call: str) -> dict:
+        """Entity info for `call`, raise KeyError if not found."""
+        call = call.strip().upper()
+        info = self._exact.get(call)
+        if info is None:
+            key = self._lookup_key(call) if "/" in call else call
+            if key is not None:
+                info = self._exact.get(key) or self._longest_prefix(key)
+        if info is None:
+            raise KeyError(call)
+        return info
+
+    def resolve_many(self, calls: Iterable[str]) -> dict[str, Optional[dict]]:
+        """Look up many calls at once (each distinct call once).
+
+        Return call -> info, None for calls that cannot be resolved.
+        """
+        result: dict[str, Optional[dict]] = {}
+        for call in calls:
+            if call in result:
+                continue
+            try:
+                result[call] = self.lookup(call)
+            except KeyError:
+                result[call] = None
+        return result
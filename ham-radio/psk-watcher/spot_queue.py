@@ -0,0 +1,98 @@
+# This is a PUBLIC DOMAIN (CC0) code for handing MQTT spots
+# from the network thread to worker threads.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Bounded queue between paho's on_message and the spot processing.
+
+on_message should return quickly, otherwise paho's network thread
+stalls and the broker may drop us. So it only calls `SpotQueue.put`;
+worker threads take the raw (topic, payload) pairs and run the handler
+(JSON decoding, lookups, file writes, notifications).
+When the queue is full, new spots are dropped (or, with `put_timeout`,
+on_message waits that long first); the counters show how often.
+"""
+import queue
+import threading
+import time
+from typing import Callable
+
+_STOP = object()
+
+
+class SpotQueue:
+    def __init__(
+        self,
+        handler: Callable[[str, bytes], None],
+        workers: int = 2,
+        maxsize: int = 1000,
+        put_timeout: float = 0.0,
+    ):
+        self.handler = handler
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"spot-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def put(self, topic: str, payload: bytes) -> bool:
+        """Queue one message, return False if it had to be dropped."""
+        try:
+            if self.put_timeout > 0:
+                self._queue.put((topic, payload), timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait((topic, payload))
+        except queue.Full:
+            with self._lock:
+                self.received += 1
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                print(f"⚠ Spot queue full, {dropped} spots dropped so far")
+            return False
+        with self._lock:
+            self.received += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            try:
+                self.handler(*item)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print("⚠ Processing of the spot failed:", e)
+            with self._lock:
+                self.processed += 1
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Let the workers finish what is queued, then stop them."""
+        deadline = time.monotonic() + timeout
+        threads = [t for t in self._threads if t.is_alive()]  # Once stopped, a no-op
+        for _ in threads:
+            self._queue.put(_STOP)
+        for t in threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "received": self.received,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "queued": self._queue.qsize(),
+                "max_depth": self.max_depth,
+            }
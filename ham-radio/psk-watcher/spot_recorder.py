@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# This is a PUBLIC DOMAIN (CC0) code recording the PSK Reporter spots
+# for the offline tests of the watchers (see spot_replay.py).
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Record the raw MQTT messages of PSK Reporter.
+
+The topics of a spot_watcher config are subscribed and every message
+is written as one JSON line {"t": receive time, "topic", "payload"}
+to a gzip-compressed file, until Ctrl-C or --duration seconds.
+
+    ./spot_recorder.py --config spot_watcher.toml spots.jsonl.gz
+"""
+import argparse
+import gzip
+import json
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+import spot_watcher
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="capture file (.jsonl.gz)")
+    parser.add_argument("--config", default=spot_watcher.DEFAULT_CONFIG)
+    parser.add_argument("--duration", type=float, default=None, help="seconds to record")
+    args = parser.parse_args(argv)
+    mqtt_cfg = spot_watcher.load_config(args.config).get("mqtt", {})
+    topics = spot_watcher.topics(mqtt_cfg)
+    broker = mqtt_cfg.get("broker", "mqtt.pskreporter.info")
+
+    fout = gzip.open(args.output, "wt", encoding="utf-8")
+    lock = threading.Lock()
+    count = 0
+
+    def on_connect(client, userdata, flags, reasonCode, properties=None):
+        print(f"✅ Connected to MQTT broker: {broker} (reasonCode={reasonCode})")
+        for topic in topics:
+            client.subscribe(topic)
+            print(f"📡 Subscribed topic: {topic}")
+
+    def on_message(client, userdata, msg):
+        nonlocal count
+        line = json.dumps(
+            {"t": time.time(), "topic": msg.topic, "payload": msg.payload.decode()}
+        )
+        with lock:
+            fout.write(line + "\n")
+            count += 1
+
+    client = mqtt.Client(
+        client_id=mqtt_cfg.get("client_id", "FT8_FT4_Watcher") + "_rec",
+        protocol=mqtt.MQTTv5,
+    )
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(broker, mqtt_cfg.get("port", 1883), keepalive=60)
+    client.loop_start()
+    start = time.monotonic()
+    try:
+        while args.duration is None or time.monotonic() - start < args.duration:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    client.loop_stop()
+    client.disconnect()
+    with lock:
+        fout.close()
+    print(f"🛑 {count} messages recorded in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
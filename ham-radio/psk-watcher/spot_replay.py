@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# This is a PUBLIC DOMAIN (CC0) code replaying recorded PSK Reporter
+# spots through the watcher, to measure what it can sustain.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Offline benchmark of the spot watcher.
+
+The messages recorded by spot_recorder.py are delivered by a local
+stand-in for the MQTT broker (honouring the subscribed topics) to the
+same queue and worker threads as in spot_watcher.py, either at the
+recorded pace (--speed 1, or faster with e.g. --speed 10) or as fast as
+possible (default; the broker then waits for room in the queue instead
+of dropping spots). At the end the throughput, the latency from the
+delivery to the end of processing (percentiles) and the time spent in
+each stage of the processing are reported.
+
+Voice and Jabber outputs are dropped from the rules, and so is "print"
+unless --print is given. The alert sinks are still written, but not
+to the files of the live watcher: to --sink-dir, or by default to a
+temporary directory removed at the end.
+
+    ./spot_replay.py --config spot_watcher.toml spots.jsonl.gz
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+import spot_watcher
+from spot_queue import SpotQueue
+
+
+def read_capture(filename: str) -> Iterator[tuple[float, str, bytes]]:
+    """(receive time, topic, payload) of the recorded messages."""
+    with gzip.open(filename, "rt", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            yield rec["t"], rec["topic"], rec["payload"].encode()
+
+
+def topic_matches(sub: str, topic: str) -> bool:
+    """MQTT topic filter matching ("+" one level, "#" the rest)."""
+    sub_levels = sub.split("/")
+    levels = topic.split("/")
+    for i, level in enumerate(sub_levels):
+        if level == "#":
+            return True
+        if i >= len(levels) or (level != "+" and level != levels[i]):
+            return False
+    return len(levels) == len(sub_levels)
+
+
+class _Message:
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic: str, payload: bytes):
+        self.topic = topic
+        self.payload = payload
+
+
+class LocalBroker:
+    """Deliver recorded messages to `on_message(client, userdata, msg)`."""
+
+    def __init__(self, messages, topics: list[str], speed: Optional[float] = None):
+        self.messages = messages
+        self.topics = list(topics)
+        self.speed = speed
+        self.recorded = 0
+        self.delivered = 0
+
+    def run(self, on_message: Callable) -> None:
+        start = None
+        for t, topic, payload in self.messages:
+            self.recorded += 1
+            if not any(topic_matches(sub, topic) for sub in self.topics):
+                continue
+            if self.speed:
+                if start is None:
+                    start = (t, time.monotonic())
+                delay = (t - start[0]) / self.speed - (time.monotonic() - start[1])
+                if delay > 0:
+                    time.sleep(delay)
+            on_message(None, None, _Message(topic, payload))
+            self.delivered += 1
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def _replay_output(out: str, sink_dir: str) -> str:
+    """The output, with its alert file (if any) moved to `sink_dir`."""
+    kind, _, path = out.partition(":")
+    if kind in spot_watcher._SINKS and path:
+        return f"{kind}:{os.path.join(sink_dir, os.path.basename(path))}"
+    return out
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="file written by spot_recorder.py")
+    parser.add_argument("--config", default=spot_watcher.DEFAULT_CONFIG)
+    parser.add_argument(
+        "--speed", type=float, default=None,
+        help="replay at this multiple of the recorded pace (default: max speed)",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--print", action="store_true", help="keep the print outputs")
+    parser.add_argument(
+        "--sink-dir", default=None,
+        help="write the alert files here (default: a temporary directory)",
+    )
+    args = parser.parse_args(argv)
+
+    tmp = None
+    if args.sink_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="spot_replay-")
+        sink_dir = tmp.name
+    else:
+        sink_dir = args.sink_dir
+        os.makedirs(sink_dir, exist_ok=True)
+    config = spot_watcher.load_config(args.config)
+    dropped = ("voice", "jabber") if args.print else ("voice", "jabber", "print")
+    for rule in config.get("rule", []):
+        rule["outputs"] = [
+            _replay_output(out, sink_dir)
+            for out in rule.get("outputs", ["print"])
+            if out.split(":")[0] not in dropped
+        ]
+    mqtt_cfg = config.get("mqtt", {})
+    watcher = spot_watcher.SpotWatcher(config)
+    watcher.timings = {}
+
+    latencies = []
+    lock = threading.Lock()
+
+    def handle(topic, item):
+        payload, delivered = item
+        watcher.process(topic, payload)
+        latency = time.perf_counter() - delivered
+        with lock:
+            latencies.append(latency)
+
+    spots = SpotQueue(
+        handle,
+        workers=args.workers or mqtt_cfg.get("workers", 2),
+        maxsize=mqtt_cfg.get("queue_size", 1000),
+        # At max speed wait for the workers, live spots would be dropped
+        put_timeout=0.0 if args.speed else 60.0,
+    )
+    watcher.spots = spots  # So that close() reports this queue
+
+    def on_message(client, userdata, msg):
+        if not watcher.wanted(msg.topic):
+            return
+        spots.put(msg.topic, (msg.payload, time.perf_counter()))
+
+    broker = LocalBroker(read_capture(args.capture), watcher.topics(), args.speed)
+    start = time.perf_counter()
+    broker.run(on_message)
+    spots.stop(timeout=3600)
+    elapsed = time.perf_counter() - start
+    watcher.close()
+    if tmp is not None:
+        tmp.cleanup()
+
+    stats = spots.stats()
+    print(f"Messages: {broker.recorded} recorded, {broker.delivered} delivered, "
+          f"{watcher.filtered} dropped by topic, "
+          f"{stats['processed']} processed, {stats['dropped']} dropped, "
+          f"{stats['errors']} errors")
+    print(f"Throughput: {stats['processed'] / elapsed:.0f} spots/s ({elapsed:.2f} s)")
+    latencies.sort()
+    print("Latency [ms]: " + " ".join(
+        f"p{p}={_percentile(latencies, p) * 1e3:.3f}" for p in (50, 90, 99)
+    ) + f" max={(latencies[-1] if latencies else float('nan')) * 1e3:.3f}")
+    print(f"{'Stage':8} {'count':>8} {'mean [µs]':>10} {'total [s]':>10}")
+    for stage, (count, total) in watcher.timings.items():
+        print(f"{stage:8} {count:8d} {total / count * 1e6:10.1f} {total:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
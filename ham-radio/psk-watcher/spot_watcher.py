@@ -0,0 +1,610 @@
+#!/usr/bin/env python3
+# This is a PUBLIC DOMAIN (CC0) code of a configurable PSK Reporter
+# spot watcher, replacing psk_watcher*.py and call_watcher.py.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""One MQTT subscription, many alert rules.
+
+The rules and outputs are read from a TOML file (spot_watcher.toml by
+default, see it for all the options). Every spot is decoded once,
+its callsign is looked up at most once (and only if a rule needs it),
+and then all the rules are checked against it:
+
+    new     - award value (award = "DXCC", "CQZ", "ITUZ" or "GRID") not
+              confirmed yet, overall or with per_band / per_mode
+              (per_band = true on DXCC is the DXCC challenge)
+    call    - one of the watched `calls` is spotted
+
+Each rule may be narrowed to `bands`, `modes` and `min_snr`, or skip
+`skip_bands`. A rule that matches is passed through the alert
+de-duplicator (keyed by the rule name) and sent to its outputs:
+"print", "voice", "jabber:<account>", and the buffered sinks of
+alert_sinks.py "file:<path>" (report lines), "jsonl:<path>" and
+"sqlite:<path>".
+
+    ./spot_watcher.py --config psk_watcher.toml
+
+By default paho-mqtt receives the spots in its network thread and
+worker threads process them. With `mode = "asyncio"` in [mqtt]
+(or --asyncio), one asyncio loop does it all: aiomqtt receives the
+spots, they are processed right away (it is only a few dict lookups
+per spot), Jabber runs on the same loop and the alert files are
+written by a single executor thread. Voice is spoken by its own
+worker thread in both modes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib
+
+from alert_dedup import AlertDeduplicator
+from alert_sinks import JsonlSink, SinkFlusher, SqliteSink, TextFileSink
+from award_index import RESOLVED_KINDS, AwardIndex, normalize
+from call_resolver import CallResolver
+from log_reloader import LogReloader
+from spot_queue import SpotQueue
+
+DEFAULT_CONFIG = "spot_watcher.toml"
+
+# Awards that can be checked for a spot (STATE is not known from a spot).
+SPOT_AWARDS = set(RESOLVED_KINDS) | {"GRID"}
+
+# Outputs buffered by alert_sinks.py, "<kind>:<path>".
+_SINKS = {"file": TextFileSink, "jsonl": JsonlSink, "sqlite": SqliteSink}
+
+# Shorthands for the typical rules.
+RULE_TYPES = {
+    "new_zone": {"type": "new", "award": "CQZ"},
+    "new_dxcc": {"type": "new", "award": "DXCC"},
+    "challenge": {"type": "new", "award": "DXCC", "per_band": True},
+    "watched_call": {"type": "call"},
+}
+
+
+def topics(
+    mqtt_config: dict,
+    bands: Optional[Iterable[str]] = None,
+    modes: Optional[Iterable[str]] = None,
+) -> list[str]:
+    """Topics to subscribe: configured, or the spots received in my grid(s).
+
+    The topics are pskr/filter/v2/band/mode/tx call/rx call/tx grid/
+    rx grid/..., one filter is made for each combination of the bands
+    (all if not configured), modes and grids, so the broker sends
+    nothing else. `bands` and `modes` narrow the configured ones further.
+    Raise ValueError if no band or no mode is left.
+    """
+    if "topics" in mqtt_config:
+        return list(mqtt_config["topics"])
+    grids = mqtt_config.get("grids") or [mqtt_config.get("grid", "KO02")]
+    all_modes = [m.upper() for m in mqtt_config.get("modes", ["FT8", "FT4"])]
+    if modes is not None:
+        modes = {m.upper() for m in modes}
+        all_modes = [m for m in all_modes if m in modes]
+    if not all_modes:
+        raise ValueError("no modes left to subscribe")
+    # Bands are lower case in the topics ("20m")
+    all_bands = mqtt_config.get("bands")
+    if all_bands is not None:
+        all_bands = {b.lower() for b in all_bands}
+    if bands is not None:
+        bands = {b.lower() for b in bands}
+        all_bands = bands if all_bands is None else all_bands & bands
+    if all_bands is None:
+        all_bands = ["+"]
+    elif not all_bands:
+        raise ValueError("no bands left to subscribe")
+    return [
+        f"pskr/filter/v2/{band}/{mode}/+/+/+/{grid}/#"
+        for band in sorted(all_bands)
+        for mode in all_modes
+        for grid in grids
+    ]
+
+
+class Spot:
+    """One PSK Reporter spot, as published on pskr/filter/v2/..."""
+
+    __slots__ = (
+        "call", "grid", "rx_call", "rx_grid", "mode", "snr", "freq", "band",
+    )
+
+    def __init__(self, data: dict):
+        self.call = str(data.get("sc", "?")).strip().upper()
+        self.grid = data.get("sl", "?")
+        self.rx_call = data.get("rc", "?")
+        self.rx_grid = data.get("rl", "?")
+        self.mode = data.get("md", "?")
+        self.snr = data.get("rp", "?")
+        self.freq = data.get("f", "?")
+        self.band = data.get("b", "?")
+
+    @classmethod
+    def from_payload(cls, payload: bytes) -> "Spot":
+        return cls(json.loads(payload))
+
+    def record(self, rule: str) -> dict:
+        """The alert as stored by the JSONL and SQLite sinks."""
+        return {
+            "time": time.time(), "rule": rule, "call": self.call, "band": self.band,
+            "mode": self.mode, "snr": self.snr, "freq": self.freq, "grid": self.grid,
+            "rx_call": self.rx_call, "rx_grid": self.rx_grid,
+        }
+
+    def report(self) -> str:
+        stime = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        return (
+            f"{stime} {self.call:>10} → {self.rx_call} "
+            f"mode={self.mode} band={self.band} SNR={self.snr} dB freq={self.freq} Hz "
+            f"TX grid={self.grid} RX grid={self.rx_grid}"
+        )
+
+
+def _upper_set(values) -> set[str]:
+    return {str(v).strip().upper() for v in values or ()}
+
+
+class Rule:
+    """One alert rule of the config, see the module docstring."""
+
+    def __init__(self, config: dict):
+        config = dict(config)
+        self.name = config.get("name") or config.get("type", "?")
+        config = {**RULE_TYPES.get(config.get("type"), {}), **config}
+        if config.get("type") in RULE_TYPES:
+            config["type"] = RULE_TYPES[config["type"]]["type"]
+        self.type = config.get("type")
+        self.award = None
+        self.calls: set[str] = set()
+        if self.type == "new":
+            self.award = str(config.get("award", "")).upper()
+            if self.award not in SPOT_AWARDS:
+                raise ValueError(
+                    f"rule {self.name}: award must be one of {sorted(SPOT_AWARDS)}"
+                )
+        elif self.type == "call":
+            self.calls = _upper_set(config.get("calls"))
+            if not self.calls:
+                raise ValueError(f"rule {self.name}: no calls to watch")
+        else:
+            raise ValueError(f"rule {self.name}: unknown type {self.type!r}")
+        self.per_band = bool(config.get("per_band", False))
+        self.per_mode = bool(config.get("per_mode", False))
+        self.bands = _upper_set(config.get("bands"))
+        self.skip_bands = _upper_set(config.get("skip_bands"))
+        self.modes = _upper_set(config.get("modes"))
+        self.min_snr = config.get("min_snr")
+        self.window = config.get("alert_window")
+        self.outputs = list(config.get("outputs", ["print"]))
+        self.voice = config.get("voice", "{rule}: {call} in band {band}")
+
+    def accepts_band_mode(self, band: str, mode: str) -> bool:
+        """Whether spots on this band and mode (upper case) may match."""
+        if self.bands and band not in self.bands:
+            return False
+        if band in self.skip_bands:
+            return False
+        return not self.modes or mode in self.modes
+
+    def accepts(self, spot: Spot) -> bool:
+        """The checks that need neither a lookup nor the log."""
+        if not self.accepts_band_mode(str(spot.band).upper(), str(spot.mode).upper()):
+            return False
+        if self.min_snr is not None:
+            if not isinstance(spot.snr, (int, float)) or spot.snr < self.min_snr:
+                return False
+        if self.type == "call":
+            return spot.call in self.calls
+        return True
+
+
+class SpotWatcher:
+    """All the rules of one config, fed from a single MQTT connection."""
+
+    def __init__(self, config: dict, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.config = config
+        self.loop = loop
+        self.mqtt = config.get("mqtt", {})
+        self.rules = [Rule(r) for r in config.get("rule", [])]
+        if not self.rules:
+            raise ValueError("no rules configured")
+        self.topics()  # Fail now if the rules leave nothing to subscribe
+        awards = {rule.award for rule in self.rules if rule.award}
+        log = config.get("log", {})
+        self.resolver = None
+        if awards & set(RESOLVED_KINDS):
+            self.resolver = CallResolver(self._lookup(log.get("cty_csv", "cty.csv")))
+        self.reloader = None
+        if awards:
+            adif = log.get("adif", "lotwreport.adi")
+            skipped_bands = log.get("skipped_bands", ())
+            # Index of the awards confirmed, overall, per band and per mode;
+            # new confirmations are picked up without a restart
+            self.reloader = LogReloader(
+                adif, resolver=self.resolver, skipped_bands=skipped_bands,
+                interval=log.get("reload_interval", 60),
+            )
+            for kind in sorted(awards):
+                print(f"{kind}s done: ", len(self.reloader.awards.worked(kind)))
+
+        alert_cfg = config.get("alerts", {})
+        # Many receivers spot the same station, report it only once per window
+        self.alerts = AlertDeduplicator(
+            windows={r.name: r.window for r in self.rules if r.window is not None},
+            default_window=alert_cfg.get("window", 600),
+        )
+        self.sinks = {}
+        self._flusher = None
+        # With an event loop the sinks are written off the loop, in order
+        self._writer = (
+            ThreadPoolExecutor(1, thread_name_prefix="alert-writer") if loop else None
+        )
+        self.voice = None
+        self.jabber = {}
+        self._open_outputs()
+        self.spots: Optional[SpotQueue] = None
+        self.processed = 0  # In the asyncio mode
+        self.filtered = 0  # Dropped by wanted()
+        self._wanted: dict[tuple[str, str], bool] = {}
+        # Stage -> (count, total seconds), if not None (see spot_replay.py)
+        self.timings: Optional[dict[str, tuple[int, float]]] = None
+        self._timings_lock = threading.Lock()
+
+    # ---------- setup ----------
+
+    @staticmethod
+    def _lookup(cty_csv: str):
+        if os.path.exists(cty_csv):
+            # Prefix trie of the local country file, much faster than pyhamtools
+            from prefix_trie import PrefixTrie
+
+            return PrefixTrie.load_or_build(cty_csv).lookup
+        from pyhamtools import Callinfo, LookupLib
+
+        return Callinfo(LookupLib(lookuptype="countryfile")).get_all
+
+    @staticmethod
+    def _credential(value):
+        """Values like "jcreds.password" are taken from jcreds.py."""
+        if isinstance(value, str) and value.startswith("jcreds."):
+            import jcreds
+
+            return getattr(jcreds, value.split(".", 1)[1])
+        return value
+
+    def _open_outputs(self) -> None:
+        outputs = {out for rule in self.rules for out in rule.outputs}
+        voice_cfg = self.config.get("voice", {})
+        jabber_cfg = self.config.get("jabber", {})
+        accounts = jabber_cfg.get("accounts", {})
+        sinks_cfg = self.config.get("sinks", {})
+        buffering = {
+            "flush_bytes": sinks_cfg.get("flush_bytes", 64 << 10),
+            "flush_interval": sinks_cfg.get("flush_interval", 5.0),
+        }
+        for out in sorted(outputs):
+            kind, _, arg = out.partition(":")
+            if kind in _SINKS:
+                if not arg:
+                    raise ValueError(f"output {out!r}: no file name")
+                options = dict(buffering)
+                if kind != "sqlite":
+                    options.update(
+                        rotate_bytes=sinks_cfg.get("rotate_bytes", 0),
+                        backups=sinks_cfg.get("backups", 5),
+                    )
+                self.sinks[out] = _SINKS[kind](arg, **options)
+            elif kind == "voice" and voice_cfg.get("enabled", True):
+                if self.voice is None:
+                    from voice import VoiceAnnouncer
+
+                    # Voice announcements are queued and spoken in the background
+                    self.voice = VoiceAnnouncer(
+                        voice_cfg.get("command", ["RHVoice-test"]),
+                        persistent=voice_cfg.get("persistent", False),
+                        cooldown=voice_cfg.get("cooldown", 300),
+                    )
+            elif kind == "jabber" and jabber_cfg.get("enabled", True):
+                if arg not in accounts:
+                    raise ValueError(f"output {out!r}: no such Jabber account")
+                from jabber_notifier import JabberNotifier
+
+                account = accounts[arg]
+                # One Jabber session per account is kept open for all the notifications
+                self.jabber[arg] = JabberNotifier(
+                    self._credential(account.get("jid", "jcreds.jid")),
+                    self._credential(account.get("password", "jcreds.password")),
+                    self._credential(account.get("target", "jcreds.target")),
+                    window=jabber_cfg.get("window", 5.0),
+                    loop=self.loop,
+                )
+            elif kind not in ("print", "voice", "jabber"):
+                raise ValueError(f"unknown output {out!r}")
+        if self.sinks:
+            self._flusher = SinkFlusher(self.sinks.values())
+
+    def topics(self) -> list[str]:
+        """Topic filters for the bands and modes some rule can use."""
+        bands = modes = None
+        if all(rule.bands for rule in self.rules):
+            bands = set().union(*(rule.bands - rule.skip_bands for rule in self.rules))
+        if all(rule.modes for rule in self.rules):
+            modes = set().union(*(rule.modes for rule in self.rules))
+        return topics(self.mqtt, bands, modes)
+
+    def wanted(self, topic: str) -> bool:
+        """Cheap check of the topic, before the payload is decoded.
+
+        Drops what the subscriptions cannot exclude, e.g. the bands
+        skipped by all the rules.
+        """
+        levels = topic.split("/", 6)
+        if len(levels) < 6:
+            return True
+        key = (levels[3].upper(), levels[4].upper())
+        ok = self._wanted.get(key)
+        if ok is None:
+            ok = self._wanted[key] = any(
+                rule.accepts_band_mode(*key) for rule in self.rules
+            )
+        if not ok:
+            self.filtered += 1
+        return ok
+
+    # ---------- spot processing ----------
+
+    def _award_value(self, rule: Rule, spot: Spot, info: dict):
+        if rule.award == "GRID":
+            return normalize("GRID", spot.grid if spot.grid != "?" else None)
+        return info.get(RESOLVED_KINDS[rule.award])
+
+    def matches(self, rule: Rule, spot: Spot, lookup, awards: AwardIndex) -> bool:
+        if not rule.accepts(spot):
+            return False
+        if rule.type != "new":
+            return True
+        info = lookup() if rule.award in RESOLVED_KINDS else {}
+        if info is None:
+            return False  # Unknown call, nothing to check
+        value = self._award_value(rule, spot, info)
+        if value is None:
+            return False
+        return awards.is_new(
+            rule.award,
+            value,
+            band=spot.band if rule.per_band else None,
+            mode=spot.mode if rule.per_mode else None,
+        )
+
+    def decode(self, payload: bytes) -> Optional[Spot]:
+        try:
+            return Spot.from_payload(payload)
+        except (ValueError, AttributeError) as e:
+            print("⚠ Parsing of the message failed:", e)
+            return None
+
+    def evaluate(self, spot: Spot) -> list[Rule]:
+        """The rules matched by the spot (before the de-duplication)."""
+        info = []
+
+        def lookup():
+            # At most one lookup per spot, and only if a rule needs it
+            if not info:
+                info.append(self.resolver.resolve(spot.call))
+            return info[0]
+
+        # The same index for all the rules, even if it is swapped meanwhile
+        awards = self.reloader.awards if self.reloader is not None else None
+        return [rule for rule in self.rules if self.matches(rule, spot, lookup, awards)]
+
+    def alert(self, spot: Spot, rules: list[Rule]) -> None:
+        """Send the spot to the outputs of the rules, unless reported recently."""
+        report = None
+        jabber_texts = {}
+        for rule in rules:
+            if not self.alerts.should_alert(spot.call, str(spot.band), rule.name):
+                continue
+            if report is None:
+                report = spot.report()
+            self._emit(rule, spot, report, jabber_texts)
+        for account, text in jabber_texts.items():
+            self.jabber[account].send(text)
+
+    def process(self, topic: str, payload: bytes) -> None:
+        if self.timings is not None:
+            self._process_timed(payload)
+            return
+        spot = self.decode(payload)
+        if spot is not None:
+            self.alert(spot, self.evaluate(spot))
+
+    def _process_timed(self, payload: bytes) -> None:
+        """process() measuring the time spent in each stage."""
+        t0 = time.perf_counter()
+        spot = self.decode(payload)
+        t1 = time.perf_counter()
+        rules = self.evaluate(spot) if spot is not None else []
+        t2 = time.perf_counter()
+        if rules:
+            self.alert(spot, rules)
+        t3 = time.perf_counter()
+        with self._timings_lock:
+            for stage, dt in (("decode", t1 - t0), ("match", t2 - t1), ("alert", t3 - t2)):
+                count, total = self.timings.get(stage, (0, 0.0))
+                self.timings[stage] = (count + 1, total + dt)
+
+    def _emit(self, rule: Rule, spot: Spot, report: str, jabber_texts: dict) -> None:
+        line = f"{rule.name:<4} {report}"
+        for out in rule.outputs:
+            kind, _, arg = out.partition(":")
+            if kind == "print":
+                print(line)
+            elif out in self.sinks:
+                record = spot.record(rule.name)
+                if self._writer is not None:
+                    self._writer.submit(self.sinks[out].write, record, report)
+                else:
+                    self.sinks[out].write(record, report)
+            elif kind == "voice" and self.voice is not None:
+                text = rule.voice.format(
+                    rule=rule.name, call=spot.call, band=spot.band, mode=spot.mode,
+                    snr=spot.snr,
+                )
+                self.voice.say(text, key=(spot.call, str(spot.band).upper()))
+            elif kind == "jabber" and arg in self.jabber:
+                jabber_texts[arg] = jabber_texts.get(arg, "") + line + "\n"
+
+    # ---------- MQTT ----------
+
+    def on_connect(self, client, userdata, flags, reasonCode, properties=None):
+        print(f"✅ Connected to MQTT broker: {self.broker} (reasonCode={reasonCode})")
+        for topic in self.topics():
+            client.subscribe(topic)
+            print(f"📡 Subscribed topic: {topic}")
+
+    def on_message(self, client, userdata, msg):
+        # Runs in the MQTT network thread, so only queue the spot
+        if self.wanted(msg.topic):
+            self.spots.put(msg.topic, msg.payload)
+
+    def on_disconnect(self, client, userdata, reasonCode, properties=None):
+        print("❌ Disconnected MQTT broker, reasonCode:", reasonCode)
+
+    def on_subscribe(self, client, userdata, mid, granted_qos, properties=None):
+        print("📩 Confirmed subscription, QoS:", granted_qos)
+
+    @property
+    def broker(self) -> str:
+        return self.mqtt.get("broker", "mqtt.pskreporter.info")
+
+    def _announce_start(self) -> None:
+        if self.voice is not None:
+            self.voice.say("Starting monitoring")
+        for name, jabber in self.jabber.items():
+            jabber.send(f"Starting monitoring ({name})")
+
+    def run(self) -> None:
+        """Receive with paho-mqtt, process in worker threads."""
+        import paho.mqtt.client as mqtt
+
+        self.spots = SpotQueue(
+            self.process,
+            workers=self.mqtt.get("workers", 2),
+            maxsize=self.mqtt.get("queue_size", 1000),
+        )
+        self._announce_start()
+        client = mqtt.Client(
+            client_id=self.mqtt.get("client_id", "FT8_FT4_Watcher"), protocol=mqtt.MQTTv5
+        )
+        client.on_connect = self.on_connect
+        client.on_message = self.on_message
+        client.on_disconnect = self.on_disconnect
+        client.on_subscribe = self.on_subscribe
+        client.enable_logger()  # connection debug
+        # MQTT without TLS = 1883, TLS = 1884
+        client.connect(self.broker, self.mqtt.get("port", 1883), keepalive=60)
+        client.loop_start()
+        print(f"🌐 Listening with {len(self.rules)} rules on broker {self.broker}…")
+        try:
+            while True:
+                time.sleep(1)  # "sleep" instead of "pass" to reduce CPU usage
+        except KeyboardInterrupt:
+            print("🛑 Stop listening…")
+            client.loop_stop()
+            client.disconnect()
+            self.close()
+
+    async def run_async(self) -> None:
+        """Receive with aiomqtt and process on the running loop."""
+        import aiomqtt
+
+        self._announce_start()
+        client_id = self.mqtt.get("client_id", "FT8_FT4_Watcher")
+        while True:
+            try:
+                async with aiomqtt.Client(
+                    self.broker,
+                    self.mqtt.get("port", 1883),
+                    identifier=client_id,
+                    protocol=aiomqtt.ProtocolVersion.V5,
+                    keepalive=60,
+                ) as client:
+                    print(f"✅ Connected to MQTT broker: {self.broker}")
+                    for topic in self.topics():
+                        await client.subscribe(topic)
+                        print(f"📡 Subscribed topic: {topic}")
+                    print(f"🌐 Listening with {len(self.rules)} rules on broker {self.broker}…")
+                    async for message in client.messages:
+                        topic = str(message.topic)
+                        if self.wanted(topic):
+                            self.process(topic, message.payload)
+                            self.processed += 1
+            except aiomqtt.MqttError as e:
+                print("❌ Disconnected MQTT broker:", e)
+                await asyncio.sleep(self.mqtt.get("reconnect_delay", 5))
+
+    def close(self) -> None:
+        if self.reloader is not None:
+            self.reloader.stop()
+        if self.spots is not None:
+            self.spots.stop()
+            print("Spot queue:", self.spots.stats())
+        else:
+            print("Spots processed:", self.processed)
+        print("Spots dropped by topic:", self.filtered)
+        print("Alerts:", self.alerts.stats())
+        if self.voice is not None:
+            self.voice.close()
+        for jabber in self.jabber.values():
+            jabber.close()
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+        if self._flusher is not None:
+            self._flusher.stop()
+        for sink in self.sinks.values():
+            sink.close()
+        if self.resolver is not None:
+            print("Callsign lookups:", self.resolver.stats())
+
+
+def load_config(filename: str) -> dict:
+    with open(filename, "rb") as f:
+        return tomllib.load(f)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="TOML file with the rules")
+    parser.add_argument(
+        "--asyncio", action="store_true", help="one asyncio loop instead of threads"
+    )
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+    if args.asyncio or config.get("mqtt", {}).get("mode") == "asyncio":
+        try:
+            asyncio.run(_run_async(config))
+        except KeyboardInterrupt:
+            print("🛑 Stop listening…")
+    else:
+        SpotWatcher(config).run()
+
+
+async def _run_async(config: dict) -> None:
+    watcher = SpotWatcher(config, loop=asyncio.get_running_loop())
+    try:
+        await watcher.run_async()
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
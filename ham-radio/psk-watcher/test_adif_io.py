@@ -0,0 +1,98 @@
+# This is a PUBLIC DOMAIN (CC0) code for testing the ADIF readers
+# of adif_io.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""The ways of reading an ADIF file must give the same QSOs.
+
+    python -m pytest test_adif_io.py
+"""
+import pytest
+
+import adif_io as af
+
+NOTES = "line1\r\nline2"
+
+
+def write_crlf_log(path, n=200):
+    """A log with CRLF line ends, a long header and multi-line values."""
+    header = "".join(f"Header line {i}\r\n" for i in range(30))
+    header += "<PROGRAMID:4>LoTW\r\n<eoh>\r\n"
+    records = []
+    for i in range(n):
+        call = f"K{i}AB"
+        record = f"<CALL:{len(call)}>{call}\r\n<BAND:3>20m\r\n<MODE:3>FT8\r\n"
+        if i % 3 == 0:
+            record += f"<NOTES:{len(NOTES)}>{NOTES}\r\n"
+        records.append(record + "<eor>\r\n")
+    with open(path, "w", newline="") as f:
+        f.write(header + "".join(records))
+
+
+def as_dicts(qsos):
+    return [dict(q) for q in qsos]
+
+
+@pytest.mark.parametrize("parser", sorted(af._PARSERS))
+def test_crlf_file_serial_and_parallel(tmp_path, monkeypatch, parser):
+    path = str(tmp_path / "crlf.adi")
+    write_crlf_log(path)
+    serial, headers = af.read_from_file(path, parser=parser)
+    assert headers["PROGRAMID"] == "LoTW"
+    assert len(serial) == 200
+    assert serial[0]["NOTES"] == NOTES
+    assert serial[1]["CALL"] == "K1AB" and "NOTES" not in serial[1]
+    # Small files are read serially, force the process pool
+    monkeypatch.setattr(af, "_PARALLEL_MIN_SIZE", 0)
+    for workers in (2, 3):
+        parallel, _ = af.read_from_file(path, parser=parser, workers=workers)
+        assert as_dicts(parallel) == as_dicts(serial)
+
+
+def test_crlf_file_other_readers(tmp_path):
+    path = str(tmp_path / "crlf.adi")
+    write_crlf_log(path)
+    serial = as_dicts(af.read_from_file(path)[0])
+    with af.iter_qsos(path) as stream:
+        assert as_dicts(stream) == serial
+    with open(path, "rb") as f:
+        assert as_dicts(af.read_from_bytes(f.read())[0]) == serial
+    qsos, _ = af.IncrementalReader(path).read_new()
+    assert as_dicts(qsos) == serial
+
+
+def test_incremental_reader_start_at(tmp_path):
+    path = str(tmp_path / "crlf.adi")
+    write_crlf_log(path, n=10)
+    qsos, headers = af.read_from_file_cached(path)
+    reader = af.IncrementalReader(path)
+    reader.start_at(headers=headers)
+    assert reader.read_new() == ([], False)
+    with open(path, "a", newline="") as f:
+        f.write("<CALL:4>W1AW\r\n<BAND:3>40m\r\n<eor>\r\n")
+    new, full = reader.read_new()
+    assert not full
+    assert as_dicts(new) == [{"CALL": "W1AW", "BAND": "40m"}]
+    assert reader.headers["PROGRAMID"] == "LoTW"
+
+
+@pytest.mark.parametrize(
+    "adif", ["<CALL:0><CALL:4>W1AW<eor>", "<BAND:3>20m<CALL:2>AB<CALL:4>W1AW<eor>"]
+)
+def test_duplicate_field_in_all_parsers(adif):
+    messages = set()
+    for parser in sorted(af._PARSERS):
+        with pytest.raises(af.AdifDuplicateFieldError) as e:
+            af.read_from_string(adif, parser)
+        messages.add(str(e.value))
+    with pytest.raises(af.AdifDuplicateFieldError) as e:
+        af.read_from_bytes(adif.encode())
+    messages.add(str(e.value))
+    assert len(messages) == 1
+
+
+def test_empty_fields_dropped():
+    adif = "<CALL:4>W1AW<NOTES:0><eor><CALL:2>AB<eor>"
+    expected = [{"CALL": "W1AW"}, {"CALL": "AB"}]
+    for parser in sorted(af._PARSERS):
+        assert as_dicts(af.read_from_string(adif, parser)[0]) == expected
+    assert as_dicts(af.read_from_bytes(adif.encode())[0]) == expected
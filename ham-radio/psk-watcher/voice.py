@@ -0,0 +1,117 @@
+# This is a PUBLIC DOMAIN (CC0) code for the voice announcements
+# of the PSK watchers.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""Background text-to-speech for the watchers.
+
+Announcements are queued and spoken one after another by a worker
+thread, so spot processing never waits for the synthesizer.
+The same station is usually spotted by many receivers, so
+announcements with the same key (e.g. call and band) are dropped
+for `cooldown` seconds.
+
+With `persistent`, one synthesizer process is kept running and fed
+one line per announcement over stdin; this needs a synthesizer that
+speaks each line as it arrives (e.g. ["espeak-ng"]).
+RHVoice-test only speaks at end of input, so it is started once
+per announcement (still without a shell).
+
+    voice = VoiceAnnouncer(["RHVoice-test"])
+    voice.say(f"New zone: {call} in band {band}", key=(call, band))
+"""
+import queue
+import subprocess
+import threading
+import time
+from typing import Callable, Hashable, Optional, Sequence
+
+_STOP = object()
+
+
+class VoiceAnnouncer:
+    def __init__(
+        self,
+        command: Sequence[str] = ("RHVoice-test",),
+        persistent: bool = False,
+        cooldown: float = 300.0,
+        maxsize: int = 20,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.command = list(command)
+        self.persistent = persistent
+        self.cooldown = cooldown
+        self.clock = clock
+        self.spoken = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self._last: dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._process: Optional[subprocess.Popen] = None
+        self._thread = threading.Thread(target=self._work, name="voice", daemon=True)
+        self._thread.start()
+
+    def say(self, text: str, key: Optional[Hashable] = None) -> bool:
+        """Queue `text`, return False if it was a duplicate or dropped."""
+        now = self.clock()
+        with self._lock:
+            if key is not None:
+                last = self._last.get(key)
+                if last is not None and now - last < self.cooldown:
+                    self.duplicates += 1
+                    return False
+            try:
+                self._queue.put_nowait(text)
+            except queue.Full:
+                # Announcements that old would be of no use anyway.
+                # The key is not remembered, so the call may be announced later.
+                self.dropped += 1
+                return False
+            if key is not None:
+                self._last[key] = now
+                if len(self._last) > 1000:
+                    self._last = {
+                        k: t for k, t in self._last.items() if now - t < self.cooldown
+                    }
+        return True
+
+    def _work(self) -> None:
+        while True:
+            text = self._queue.get()
+            if text is _STOP:
+                return
+            try:
+                self._speak(text)
+                self.spoken += 1
+            except Exception as e:
+                print("⚠ Voice announcement failed:", e)
+
+    def _speak(self, text: str) -> None:
+        line = " ".join(text.split())  # One line per announcement
+        if not self.persistent:
+            subprocess.run(self.command, input=line + "\n", text=True, check=False)
+            return
+        for attempt in range(2):
+            if self._process is None or self._process.poll() is not None:
+                self._process = subprocess.Popen(
+                    self.command, stdin=subprocess.PIPE, text=True
+                )
+            try:
+                self._process.stdin.write(line + "\n")
+                self._process.stdin.flush()
+                return
+            except (BrokenPipeError, OSError):
+                # The synthesizer died, start a new one and retry once.
+                self._process = None
+        raise RuntimeError(f"cannot feed {self.command[0]}")
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Speak what is queued (within `timeout`), then stop."""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout)
+            except Exception:
+                self._process.kill()
@@ -0,0 +1,146 @@
+# This is a PUBLIC DOMAIN (CC0) code for testing the callsign lookups
+# of usa_state.py against a local stand-in for callook.info.
+# No warranty of any kind is given.
+# You use it on your own risk
+"""lookup_many() against an aiohttp.web server on localhost.
+
+    python -m pytest test_usa_state.py
+"""
+import asyncio
+import socket
+
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+pytest.importorskip("aiosqlite")
+
+import usa_state  # noqa: E402
+
+# Seconds the stand-in server waits before answering, per call
+DELAYS = {"K1SLOW": 0.4, "K2FAST": 0.0}
+TIMEOUT = 0.5
+
+
+class Callook:
+    """Stand-in for callook.info, counting the requests."""
+
+    def __init__(self):
+        self.requests: dict[str, int] = {}
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, request):
+        callsign = request.match_info["callsign"]
+        self.requests[callsign] = self.requests.get(callsign, 0) + 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if callsign == "K1HANG":
+                await asyncio.sleep(TIMEOUT * 4)
+            await asyncio.sleep(DELAYS.get(callsign, 0.05))
+            if callsign == "K1ERR":
+                return web.Response(status=500)
+            if callsign == "N0NE":
+                return web.json_response({"status": "INVALID"})
+            return web.json_response({
+                "status": "VALID",
+                "current": {"callsign": callsign, "operClass": "EXTRA"},
+                "name": "TEST",
+                "address": {"line2": "HARTFORD, CT 06101"},
+                "location": {"latitude": "41.7", "longitude": "-72.7", "gridsquare": "FN31"},
+            })
+        finally:
+            self.active -= 1
+
+
+async def _run_lookups(tmp_path, calls, concurrency):
+    callook = Callook()
+    app = web.Application()
+    app.router.add_get("/{callsign}/json", callook.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    site = web.SockSite(runner, sock)
+    await site.start()
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}/{{callsign}}/json"
+    results = []
+    try:
+        async with usa_state.CallsignCache(str(tmp_path / "cache.db")) as cache:
+            async for result in usa_state.lookup_many(calls, concurrency, url, cache):
+                results.append(result)
+    finally:
+        await runner.cleanup()
+    return callook, results
+
+
+def lookup(tmp_path, monkeypatch, calls, concurrency=8):
+    monkeypatch.setattr(usa_state, "HTTP_TIMEOUT", TIMEOUT)
+    return asyncio.run(_run_lookups(tmp_path, calls, concurrency))
+
+
+def test_concurrency_is_bounded(tmp_path, monkeypatch):
+    calls = [f"K{i}TST" for i in range(20)]
+    callook, results = lookup(tmp_path, monkeypatch, calls, concurrency=3)
+    assert callook.max_active == 3
+    assert sorted(cs for cs, _ in results) == sorted(calls)
+
+
+def test_repeated_calls_are_looked_up_once(tmp_path, monkeypatch):
+    calls = ["K1ABC", "k1abc", " K1ABC ", "W2XYZ", "K1ABC", "W2XYZ"]
+    callook, results = lookup(tmp_path, monkeypatch, calls)
+    assert callook.requests == {"K1ABC": 1, "W2XYZ": 1}
+    assert sorted(cs for cs, _ in results) == ["K1ABC", "W2XYZ"]
+    assert all(info["state_code"] == "CT" for _, info in results)
+
+
+def test_results_stream_in_completion_order(tmp_path, monkeypatch):
+    callook, results = lookup(tmp_path, monkeypatch, ["K1SLOW", "K2FAST"])
+    assert [cs for cs, _ in results] == ["K2FAST", "K1SLOW"]
+
+
+def test_failed_lookups_give_none(tmp_path, monkeypatch):
+    calls = ["K1ERR", "K1HANG", "N0NE", "K1ABC", "?"]
+    callook, results = lookup(tmp_path, monkeypatch, calls)
+    results = dict(results)
+    assert results["K1ERR"] is None  # HTTP 500
+    assert results["K1HANG"] is None  # Timeout
+    assert results["N0NE"] is None  # Not valid
+    assert results["?"] is None  # Bad format, not asked at all
+    assert results["K1ABC"]["state_name"] == "Connecticut"
+    assert "?" not in callook.requests
+
+
+def test_prefetch_remembers_missing_calls(tmp_path):
+    async def run():
+        async with usa_state.CallsignCache(str(tmp_path / "cache.db")) as cache:
+            await cache.save("K1ABC", {"callsign": "K1ABC", "state_code": "CT"})
+            await cache.flush()
+            cache._lru.clear()
+            await cache.prefetch(["K1ABC", "W2XYZ"])
+            execute, cache._db.execute = cache._db.execute, None  # No more queries
+            try:
+                assert (await cache.load("K1ABC"))["state_name"] == "Connecticut"
+                assert await cache.load("W2XYZ") is usa_state.NOT_CACHED
+            finally:
+                cache._db.execute = execute
+
+    asyncio.run(run())
+
+
+def test_load_without_lru(tmp_path):
+    async def run():
+        record = {"callsign": "K1ABC", "state_code": "CT"}
+        path = str(tmp_path / "cache.db")
+        async with usa_state.CallsignCache(path, lru_size=0) as cache:
+            await cache.save("K1ABC", record)
+            await cache.save("N0NE", None)
+            # Pending, not in the database yet
+            assert (await cache.load("K1ABC"))["state_name"] == "Connecticut"
+            assert await cache.load("N0NE") is None
+            await cache.flush()
+            assert (await cache.load("K1ABC"))["state_code"] == "CT"
+            assert await cache.load("N0NE") is None
+            assert await cache.load("W2XYZ") is usa_state.NOT_CACHED
+
+    asyncio.run(run())
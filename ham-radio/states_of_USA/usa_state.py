@@ -8,10 +8,18 @@ import json
 import re
 import time
 import sys
-from typing import Optional
+from collections import OrderedDict
+from typing import AsyncIterator, Iterable, Optional
 
 CACHE_DB = "callsign_cache.db"
 CACHE_TTL = 7 * 24 * 3600  # 7 dni
+NEGATIVE_CACHE_TTL = 24 * 3600  # Calls not known to callook, checked again after a day
+CALLOOK_URL = "https://callook.info/{callsign}/json"
+HTTP_TIMEOUT = 10  # s, for the whole request
+HTTP_HEADERS = {
+    "User-Agent": "ham-radio-lookup/1.0 (aiohttp)"
+}
+CALLSIGN_RE = re.compile(r"^[A-Z0-9]{3,}$")
 
 STATE_NAMES = {
     "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas",
@@ -72,6 +80,220 @@ async def save_to_cache(callsign: str, data: dict):
         await db.commit()
 
 
+# Returned by CallsignCache.load() for calls it knows nothing about
+# (None there means "known to be invalid or unknown").
+NOT_CACHED = object()
+
+# Columns of the parsed records, in the order of the callsign_info table.
+RECORD_COLUMNS = (
+    "callsign", "name", "state_code", "gridsquare", "latitude", "longitude",
+    "license_class",
+)
+
+
+class CallsignCache:
+    """The parsed callook records over one long-lived connection.
+
+    The records are stored in typed columns of the callsign_info table
+    (found = 0 for calls callook reports as not valid, remembered only
+    for `negative_ttl`), so a hit needs neither json.loads nor parsing.
+    The most recently used `lru_size` records are also kept in memory.
+    The database is in WAL mode, new entries are kept in memory and
+    written `batch_size` at a time in one transaction (and on flush()
+    and close()). prefetch() reads the entries of many calls with
+    a few SELECT ... IN (...) queries, e.g. for all calls of a log,
+    and remembers the calls not found, so load() needs no query for
+    them either.
+
+        async with CallsignCache() as cache:
+            await cache.prefetch(calls)
+            ...
+    """
+
+    # Calls per SELECT ... IN (...), below SQLite's limit of variables
+    PREFETCH_CHUNK = 500
+
+    def __init__(
+        self,
+        path: str = CACHE_DB,
+        ttl: int = CACHE_TTL,
+        negative_ttl: int = NEGATIVE_CACHE_TTL,
+        batch_size: int = 200,
+        lru_size: int = 20000,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.batch_size = batch_size
+        self.lru_size = lru_size
+        self._db: Optional[aiosqlite.Connection] = None
+        # callsign -> (record or None, expiry time), most recently used last
+        self._lru: OrderedDict[str, tuple[Optional[dict], float]] = OrderedDict()
+        # callsign -> row not written yet
+        self._pending: dict[str, tuple] = {}
+        # Calls prefetch() found no fresh entry for
+        self._absent: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    async def open(self) -> "CallsignCache":
+        self._db = await aiosqlite.connect(self.path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS callsign_info (
+                callsign TEXT PRIMARY KEY,
+                name TEXT,
+                state_code TEXT,
+                gridsquare TEXT,
+                latitude REAL,
+                longitude REAL,
+                license_class TEXT,
+                found INTEGER NOT NULL,
+                timestamp INTEGER NOT NULL
+            )
+        """)
+        await self._db.commit()
+        await self._import_raw_cache()
+        return self
+
+    async def _import_raw_cache(self):
+        """Parse the entries of the old raw JSON table once."""
+        async with self._db.execute("SELECT COUNT(*) FROM callsign_info") as cursor:
+            (count,) = await cursor.fetchone()
+        async with self._db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'callsign_cache'"
+        ) as cursor:
+            has_raw = await cursor.fetchone() is not None
+        if count or not has_raw:
+            return
+        async with self._db.execute(
+            "SELECT callsign, data, timestamp FROM callsign_cache"
+        ) as cursor:
+            async for callsign, data, ts in cursor:
+                self._pending[callsign] = self._row(
+                    callsign, parse_callook_data(json.loads(data)), ts
+                )
+        await self.flush()
+
+    async def close(self):
+        if self._db is not None:
+            await self.flush()
+            await self._db.close()
+            self._db = None
+
+    async def __aenter__(self) -> "CallsignCache":
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ---------- records ----------
+
+    @staticmethod
+    def _row(callsign: str, record: Optional[dict], ts: int) -> tuple:
+        if record is None:
+            return (callsign, None, None, None, None, None, None, 0, ts)
+        return (callsign, *(record.get(c) for c in RECORD_COLUMNS[1:]), 1, ts)
+
+    def _remember(self, callsign: str, record: Optional[dict], ts: float):
+        expiry = ts + (self.ttl if record is not None else self.negative_ttl)
+        self._lru[callsign] = (record, expiry)
+        self._lru.move_to_end(callsign)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _remember_row(self, row) -> Optional[dict]:
+        """Remember the record of a callsign_info row, and return it."""
+        *values, found, ts = row
+        record = None
+        if found:
+            record = dict(zip(RECORD_COLUMNS, values))
+            record["state_name"] = STATE_NAMES.get(record["state_code"])
+        self._remember(row[0], record, ts)
+        return record
+
+    def _columns_sql(self) -> str:
+        return ", ".join(RECORD_COLUMNS) + ", found, timestamp"
+
+    def _fresh_sql(self) -> tuple[str, tuple]:
+        """WHERE condition (and its arguments) for the entries not expired."""
+        now = int(time.time())
+        return (
+            "timestamp >= CASE found WHEN 1 THEN ? ELSE ? END",
+            (now - self.ttl, now - self.negative_ttl),
+        )
+
+    # ---------- API ----------
+
+    async def prefetch(self, callsigns: Iterable[str]):
+        calls = sorted(
+            {c.strip().upper() for c in callsigns} - self._lru.keys() - self._pending.keys()
+        )
+        fresh, fresh_args = self._fresh_sql()
+        for i in range(0, len(calls), self.PREFETCH_CHUNK):
+            chunk = calls[i:i + self.PREFETCH_CHUNK]
+            absent = set(chunk)
+            async with self._db.execute(
+                f"SELECT {self._columns_sql()} FROM callsign_info"
+                f" WHERE {fresh} AND callsign IN ({', '.join('?' * len(chunk))})",
+                (*fresh_args, *chunk)
+            ) as cursor:
+                async for row in cursor:
+                    self._remember_row(row)
+                    absent.discard(row[0])
+            self._absent |= absent
+
+    async def load(self, callsign: str):
+        """The cached record, None for a known bad call or NOT_CACHED."""
+        entry = self._lru.get(callsign)
+        if entry is not None:
+            record, expiry = entry
+            if expiry >= time.time():
+                self._lru.move_to_end(callsign)
+                self.hits += 1
+                return record
+            del self._lru[callsign]
+        if callsign in self._absent:
+            self.misses += 1
+            return NOT_CACHED
+        # Saved, but maybe not written yet (or not kept by a small LRU)
+        row = self._pending.get(callsign)
+        if row is None:
+            fresh, fresh_args = self._fresh_sql()
+            async with self._db.execute(
+                f"SELECT {self._columns_sql()} FROM callsign_info"
+                f" WHERE {fresh} AND callsign = ?",
+                (*fresh_args, callsign)
+            ) as cursor:
+                row = await cursor.fetchone()
+            if not row:
+                self.misses += 1
+                return NOT_CACHED
+        self.hits += 1
+        return self._remember_row(row)
+
+    async def save(self, callsign: str, record: Optional[dict]):
+        """Store a parsed record, or None for a call callook does not know."""
+        ts = int(time.time())
+        self._absent.discard(callsign)
+        self._remember(callsign, record, ts)
+        self._pending[callsign] = self._row(callsign, record, ts)
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, {}
+        await self._db.executemany(
+            f"REPLACE INTO callsign_info ({self._columns_sql()})"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            list(rows.values())
+        )
+        await self._db.commit()
+
+
 # ---------- PARSER ----------
 
 def parse_callook_data(data: dict) -> Optional[dict]:
@@ -101,51 +323,123 @@ def parse_callook_data(data: dict) -> Optional[dict]:
 
 # ---------- API ----------
 
-async def fetch_from_callook(callsign: str) -> Optional[dict]:
-    url = f"https://callook.info/{callsign}/json"
-    headers = {
-        "User-Agent": "ham-radio-lookup/1.0 (aiohttp)"
-    }
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-            if resp.status != 200:
-                return None
-            return await resp.json()
-
-
-async def lookup_callsign(callsign: str) -> Optional[dict]:
+async def fetch_from_callook(
+    callsign: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    url: str = CALLOOK_URL,
+) -> Optional[dict]:
+    # Without a session, one is opened just for this request
+    if session is None:
+        async with aiohttp.ClientSession(headers=HTTP_HEADERS) as session:
+            return await fetch_from_callook(callsign, session, url)
+
+    async with session.get(
+        url.format(callsign=callsign), timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    ) as resp:
+        if resp.status != 200:
+            return None
+        return await resp.json()
+
+
+async def lookup_callsign(
+    callsign: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    url: str = CALLOOK_URL,
+    cache: Optional[CallsignCache] = None,
+) -> Optional[dict]:
     callsign = callsign.strip().upper()
 
-    if not re.match(r"^[A-Z0-9]{3,}$", callsign):
+    if not CALLSIGN_RE.match(callsign):
         raise ValueError("Invalid callsign format")
 
     # 1️⃣ cache
-    cached = await load_from_cache(callsign)
-    if cached:
-        return parse_callook_data(cached)
+    if cache is not None:
+        record = await cache.load(callsign)
+        if record is not NOT_CACHED:
+            return record
+    else:
+        cached = await load_from_cache(callsign)
+        if cached:
+            return parse_callook_data(cached)
 
     # 2️⃣ API
-    data = await fetch_from_callook(callsign)
+    data = await fetch_from_callook(callsign, session, url)
     if not data:
-        return None
-
-    # 3️⃣ save
-    await save_to_cache(callsign, data)
-
-    return parse_callook_data(data)
+        return None  # HTTP error, may work next time
+
+    # 3️⃣ save (also "not valid" answers, so they are not asked again)
+    record = parse_callook_data(data)
+    if cache is not None:
+        await cache.save(callsign, record)
+    else:
+        await save_to_cache(callsign, data)
+
+    return record
+
+
+async def lookup_many(
+    calls: Iterable[str],
+    concurrency: int = 8,
+    url: str = CALLOOK_URL,
+    cache: Optional[CallsignCache] = None,
+) -> AsyncIterator[tuple[str, Optional[dict]]]:
+    """Look up many calls, yield (callsign, info) as the lookups complete.
+
+    All the requests share one session (and its connection pool), at
+    most `concurrency` of them run at a time. Each distinct call is
+    looked up once, however often it appears in `calls`.
+    Invalid calls and failed lookups give None.
+    Without `cache`, a CallsignCache of CACHE_DB is used; the cached
+    entries of all the calls are read at once before the lookups start.
+    """
+    if cache is None:
+        async with CallsignCache() as cache:
+            async for result in lookup_many(calls, concurrency, url, cache):
+                yield result
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(callsign: str, session: aiohttp.ClientSession):
+        async with semaphore:
+            try:
+                return callsign, await lookup_callsign(callsign, session, url, cache)
+            except (ValueError, aiohttp.ClientError, asyncio.TimeoutError):
+                return callsign, None
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(headers=HTTP_HEADERS, connector=connector) as session:
+        # callsign -> its lookup, so repeated calls share the one in flight
+        tasks: dict[str, asyncio.Task] = {}
+        callsigns = list(dict.fromkeys(c.strip().upper() for c in calls if c.strip()))
+        await cache.prefetch(callsigns)
+        for callsign in callsigns:
+            tasks[callsign] = asyncio.ensure_future(lookup(callsign, session))
+        try:
+            for next_done in asyncio.as_completed(tasks.values()):
+                yield await next_done
+        finally:
+            for task in tasks.values():
+                task.cancel()
 
 
 # ---------- DEMO ----------
 
 async def main():
-    await init_db()
-    while True:
-        sys.stdout.write("Callsign:\n")
-        cs = sys.stdin.readline().strip()
-    #for cs in ("K4MPM", "W6XYZ", "N0CALL"):
-        info = await lookup_callsign(cs)
-        print(cs, "→", info)
+    if len(sys.argv) > 1:
+        # Calls given as arguments (or "-" for one per line on stdin)
+        calls = sys.stdin.read().split() if sys.argv[1:] == ["-"] else sys.argv[1:]
+        async for cs, info in lookup_many(calls):
+            print(cs, "→", info)
+        return
+    # One connection for the whole session, each new entry written at once
+    async with CallsignCache(batch_size=1) as cache:
+        while True:
+            sys.stdout.write("Callsign:\n")
+            cs = sys.stdin.readline().strip()
+        #for cs in ("K4MPM", "W6XYZ", "N0CALL"):
+            info = await lookup_callsign(cs, cache=cache)
+            print(cs, "→", info)
 
 
 if __name__ == "__main__":